@@ -1,32 +1,110 @@
 import sys
 import os
-import requests
+import time
+
+class StartupProfiler:
+    """記錄各啟動階段的時間點，以 --profile-startup 參數或環境變數 RAIDERIO_PROFILE_STARTUP=1 開啟；
+    關閉時 mark() 不做任何事"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._marks = []
+
+    def mark(self, phase):
+        if self.enabled:
+            self._marks.append((phase, time.perf_counter()))
+
+    def report(self):
+        """輸出各階段的累計與個別耗時（毫秒），只輸出一次"""
+        if not self.enabled or not self._marks:
+            return
+        lines = [f"啟動效能分析 {time.strftime('%Y/%m/%d %H:%M:%S', time.localtime(self.started_at))}"]
+        previous = self._start
+        for phase, at in self._marks:
+            lines.append(f"{(at - self._start) * 1000:9.1f} ms  (+{(at - previous) * 1000:7.1f} ms)  {phase}")
+            previous = at
+        self._marks = []
+        print("\n".join(lines), file=sys.stderr)
+
+startup_profiler = StartupProfiler("--profile-startup" in sys.argv or os.environ.get("RAIDERIO_PROFILE_STARTUP") == "1")
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, 
-                            QTreeWidget, QTreeWidgetItem, QScrollArea, QLabel, QHBoxLayout, 
+                            QScrollArea, QLabel, QHBoxLayout, 
                             QFrame, QToolButton, QDialog, QLineEdit, QTableWidget, QTableWidgetItem,
-                            QHeaderView, QMessageBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QFont, QColor, QFontDatabase, QPixmap, QIcon
-from PyQt5.QtWidgets import QStyle  # 引入 QStyle 以使用內建圖示
-from datetime import datetime
-import traceback
-import urllib.request
-from io import BytesIO
+                            QHeaderView, QMessageBox, QTreeView, QStyledItemDelegate, QFileDialog,
+                            QPlainTextEdit, QComboBox, QSpinBox)
+from PyQt5.QtCore import Qt, QThread, QObject, QTimer, QEvent, QAbstractItemModel, QModelIndex, QRect, QSize, pyqtSignal
+from PyQt5.QtGui import QFont, QColor, QFontDatabase, QPixmap, QImage, QIcon, QPainter
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
+startup_profiler.mark("匯入 PyQt5")
+# 查詢、快取與解析邏輯不依賴 Qt，放在 raiderio_core（也提供命令列批次模式）
+from raiderio_core import (MAX_CONCURRENT_REQUESTS, DiskCache, get_cache_dir, download_bytes,
+                           AFFIX_REGION, AFFIX_ICON_BASE, load_cached_affixes, fetch_affixes,
+                           get_roster_store, load_roster, fetch_roster, record_fetch_results, import_guild,
+                           metrics, timed, AUTO_REFRESH_INTERVAL, due_for_refresh, CancelToken, REFRESH_TIMEOUT,
+                           CHARACTER_TIMEOUT, normalize_tiers, fetch_character_profile,
+                           DUNGEON_NAME_MAPPING, ROSTER_SORTS, RosterFilter, RosterIndex)
+startup_profiler.mark("匯入 raiderio_core")
 
 # 動態獲取資源文件路徑（適應 PyInstaller 打包）
 def resource_path(relative_path):
     """獲取資源文件的絕對路徑，適應 PyInstaller 打包"""
     if hasattr(sys, '_MEIPASS'):
-        print("臨時目錄:", sys._MEIPASS)
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
-# 獲取 characters.txt 的儲存路徑（用戶家目錄下的 Documents 資料夾）
-def get_characters_file_path():
-    documents_path = os.path.expanduser("~/Documents")
-    if not os.path.exists(documents_path):
-        os.makedirs(documents_path)
-    return os.path.join(documents_path, "characters.txt")
+_refresh_icon = None
+
+def get_refresh_icon():
+    """「更新資料」按鈕的圖示，只從檔案載入一次"""
+    global _refresh_icon
+    if _refresh_icon is None:
+        _refresh_icon = QIcon(resource_path("refresh.ico"))
+    return _refresh_icon
+
+def load_deferred_assets(window):
+    """載入首個畫面用不到的應用程式圖示與字型，於首次繪製後呼叫"""
+    app = QApplication.instance()
+    icon = QIcon(resource_path("icon.ico"))
+    if icon.isNull():
+        print("應用程式圖標載入失敗")
+    app.setWindowIcon(icon)
+    window.setWindowIcon(icon)
+
+    font_id = QFontDatabase.addApplicationFont(resource_path("NotoSansTC-SemiBold.ttf"))
+    if font_id == -1:
+        print("無法載入 Noto Sans TC SemiBold 字型")
+    elif QFontDatabase.applicationFontFamilies(font_id):
+        app.setFont(get_font())
+
+# 逐一顯示查詢完成的角色卡片，而非等待全部角色完成後才一次顯示
+STREAM_RESULTS = True
+
+# 角色資料的顯示方式："widgets" 為逐列建立元件的卡片介面，
+# "view" 為 QTreeView 搭配自訂繪製器，只繪製可見的列，適合大型名單
+RENDER_ENGINE = "widgets"
+
+# 圖片磁碟快取的容量上限（位元組），只保存原始圖檔
+IMAGE_CACHE_MAX_BYTES = 20 * 1024 * 1024
+
+# 已縮放圖片在記憶體中的容量預算（位元組）
+IMAGE_MEMORY_BUDGET = 8 * 1024 * 1024
+
+# 背景下載圖片的執行緒數量與等待佇列上限；佇列已滿時捨棄最早排入的載入，其標籤改為顯示替代文字
+IMAGE_LOADER_WORKERS = 4
+IMAGE_LOADER_QUEUE_SIZE = 512
+
+# 背景自動更新的計時間隔下限（秒）；名單很大時每次計時查詢多個角色，而不是縮短間隔
+AUTO_REFRESH_MIN_TICK = 2
+
+# 排序選單的顯示文字（對應 ROSTER_SORTS）
+SORT_LABELS = {"roster": "名單順序", "score": "分數", "name": "名稱", "realm": "伺服器", "level": "層數"}
+
+# 角色資料更新後重新套用篩選與排序的延遲（毫秒），連續送達的結果只套用一次
+FILTER_REFRESH_DELAY = 50
 
 # 定義職業顏色表
 CLASS_COLORS = {
@@ -45,18 +123,423 @@ CLASS_COLORS = {
     "Warrior": "#C69B6D"
 }
 
-# 定義副本名稱映射表（英文 -> 繁體中文）
-DUNGEON_NAME_MAPPING = {
-    "Darkflame Cleft": "暗焰裂隙",
-    "Operation: Floodgate": "水閘行動",
-    "Cinderbrew Meadery": "燼釀酒莊",
-    "The MOTHERLODE!!": "晶礦母脈",
-    "The Rookery": "鴉巢",
-    "Theater of Pain": "苦痛劇場",
-    "Priory of the Sacred Flame": "聖焰隱修院",
-    "Mechagon Workshop": "機械岡行動：工坊"
+# 分數與鑰石層數的色階：(下限, 等級)，由高到低；等級即樣式表中 tier 屬性的值
+SCORE_TIERS = ((2000, "epic"), (1500, "rare"), (1000, "uncommon"), (500, "common"))
+LEVEL_TIERS = ((20, "epic"), (15, "rare"), (10, "uncommon"), (5, "common"))
+TIER_COLORS = {
+    "epic": "#E16AFF",
+    "rare": "#4C97FC",
+    "uncommon": "#1CE2B2",
+    "common": "#67FD0A",
+    "none": "#FFFFFF",
 }
 
+def get_tier(value, tiers):
+    for minimum, tier in tiers:
+        if value >= minimum:
+            return tier
+    return "none"
+
+def class_property(class_name):
+    """職業名稱轉為樣式表的 playerClass 屬性值（去除空白），未知職業回傳空字串"""
+    return class_name.replace(" ", "") if class_name in CLASS_COLORS else ""
+
+# 全域樣式表：元件以 objectName 區分，分數等級、鑰石結果與職業以動態屬性切換，
+# 更新資料時只需改變屬性，不必為每個元件產生並解析新的樣式表
+THEME_STYLESHEET = """
+    QMainWindow, QWidget {
+        background-color: #0f1318;
+        color: #ffffff;
+    }
+    QScrollArea {
+        border: none;
+        background-color: #0f1318;
+    }
+    QLabel {
+        color: #ffffff;
+    }
+
+    QLabel#logoLabel, QLabel#affixTitle {
+        color: #FF9A00;
+    }
+    QFrame#affixesFrame, QFrame#affixesFrame * {
+        background-color: #252C38;
+        border-radius: 4px;
+        padding: 2px;
+    }
+    QLabel#affixIcon {
+        color: #FFFFFF;
+        font: 12px 'Noto Sans TC';
+    }
+    QLabel#affixError {
+        color: #FF5555;
+        font: 12px 'Noto Sans TC';
+    }
+    QPushButton#headerButton {
+        background-color: #FF9A00;
+        color: #ffffff;
+        padding: 8px;
+        border-radius: 4px;
+        font-weight: bold;
+    }
+    QPushButton#headerButton:hover {
+        background-color: #FF8500;
+    }
+    QPushButton#headerButton:pressed {
+        background-color: #E07800;
+    }
+    QPushButton#headerButton:disabled {
+        background-color: #555555;
+        color: #888888;
+    }
+    QFrame#headerSeparator {
+        background-color: #2A2F36;
+        min-height: 2px;
+    }
+
+    QScrollArea#cardScrollArea QScrollBar:vertical {
+        background: #1D2128;
+        width: 12px;
+        margin: 0px;
+    }
+    QScrollArea#cardScrollArea QScrollBar::handle:vertical {
+        background: #434953;
+        min-height: 20px;
+        border-radius: 6px;
+    }
+    QScrollArea#cardScrollArea QScrollBar::add-line:vertical, QScrollArea#cardScrollArea QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollArea#cardScrollArea QScrollBar::add-page:vertical, QScrollArea#cardScrollArea QScrollBar::sub-page:vertical {
+        background: none;
+    }
+    QTreeView#rosterView {
+        background-color: #0f1318;
+        border: none;
+    }
+    QTreeView#rosterView QHeaderView::section {
+        background-color: #1D2128;
+        color: #999999;
+        padding: 5px;
+        border: none;
+        font-weight: bold;
+    }
+    QStatusBar, QStatusBar * {
+        background-color: #16181D;
+        color: #999999;
+        padding: 5px;
+    }
+    QToolButton#diagnosticsButton {
+        color: #999999;
+        border: none;
+        padding: 0 5px;
+    }
+    QPlainTextEdit#diagnosticsSummary {
+        background-color: #1D2128;
+        color: #ffffff;
+        border: 1px solid #2A2F36;
+    }
+    QLabel#errorMessage {
+        color: #FF5555;
+        padding: 20px;
+    }
+    QLabel#emptyRosterMessage {
+        color: #FF5555;
+        font: 12px 'Noto Sans TC';
+        padding: 20px;
+    }
+
+    QFrame#cardHeader, QFrame#cardHeader *, QFrame#cardPlaceholder, QFrame#cardPlaceholder * {
+        background-color: #252C38;
+        border-radius: 6px;
+    }
+    QLabel#thumbnailLabel {
+        color: #999999;
+        font: 12px 'Noto Sans TC';
+    }
+    QLabel#realmLabel {
+        color: #999999;
+    }
+    QLabel#loadingLabel {
+        color: #999999;
+        font: 14px 'Noto Sans TC';
+    }
+    QLabel#scoreBadge {
+        background-color: #1D2128;
+        padding: 5px 10px;
+        border-radius: 4px;
+    }
+    QLabel#scoreBadge[tier="missing"] {
+        color: #999999;
+        background-color: #252C38;
+        padding: 0px;
+    }
+    QFrame#cardContent, QFrame#cardContent * {
+        background-color: #1D2128;
+        border-radius: 6px;
+        margin-top: 2px;
+    }
+    QWidget#dungeonRow, QWidget#dungeonRow * {
+        background-color: #202830;
+        border-radius: 4px;
+        margin-bottom: 1px;
+    }
+    QFrame#recentRuns, QFrame#recentRuns * {
+        background-color: #1A2029;
+        border-radius: 4px;
+        margin-top: 1px;
+    }
+    QToolButton#cardToggle, QToolButton#detailToggle {
+        background-color: transparent;
+        color: #999999;
+        border: none;
+        font-size: 14px;
+        font-weight: bold;
+    }
+    QToolButton#detailToggle {
+        font-size: 12px;
+    }
+    QToolButton#cardToggle:hover, QToolButton#detailToggle:hover {
+        color: #FFFFFF;
+    }
+    QLabel#columnHeader {
+        color: #999999;
+    }
+    QLabel#contentError {
+        color: #FF5555;
+    }
+    QLabel#noRecord {
+        color: #999999;
+        padding: 10px;
+    }
+    QFrame#rowSeparator {
+        background-color: #2A2F36;
+        max-height: 1px;
+    }
+    QLabel#recentTitle {
+        color: #999999;
+        font-size: 11px;
+        margin-top: 2px;
+    }
+    QLabel#noRecentRecord {
+        color: #999999;
+        padding: 3px;
+    }
+    QWidget#filterBar QLineEdit, QWidget#filterBar QComboBox, QWidget#filterBar QSpinBox {
+        background-color: #1D2128;
+        color: #ffffff;
+        border: 1px solid #2A2F36;
+        border-radius: 4px;
+        padding: 4px 6px;
+    }
+    QWidget#filterBar QComboBox QAbstractItemView {
+        background-color: #1D2128;
+        selection-background-color: #434953;
+    }
+    QLabel#filterLabel {
+        color: #999999;
+    }
+    QLabel[keystone="timed"] {
+        color: #67FD0A;
+    }
+    QLabel[keystone="depleted"] {
+        color: #FF5555;
+    }
+"""
+
+def build_stylesheet():
+    """全域樣式表加上依色階與職業顏色表產生的屬性規則"""
+    rules = [THEME_STYLESHEET]
+    rules.extend(f'QLabel[tier="{tier}"] {{ color: {color}; }}' for tier, color in TIER_COLORS.items())
+    rules.extend(f'QLabel#characterName[playerClass="{class_property(class_name)}"] {{ color: {color}; }}'
+                 for class_name, color in CLASS_COLORS.items())
+    return "\n".join(rules)
+
+def apply_theme(app):
+    """為整個應用程式套用樣式表（只解析一次）"""
+    if not app.property("themeApplied"):
+        app.setStyleSheet(build_stylesheet())
+        app.setProperty("themeApplied", True)
+
+def set_style_property(widget, name, value):
+    """切換元件的動態屬性並重新套用樣式；值未改變時不做任何事。
+    尚未顯示過的元件在第一次顯示時才套用樣式，因此只需設定屬性"""
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    if widget.testAttribute(Qt.WA_WState_Polished):
+        style = widget.style()
+        style.unpolish(widget)
+        style.polish(widget)
+
+_fonts = {}
+
+def get_font(point_size=10, bold=False, family="Noto Sans TC"):
+    """共用的字型物件：相同設定只建立一次，各元件以 setFont 共用"""
+    key = (family, point_size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = QFont(family, point_size, QFont.Bold if bold else QFont.Normal)
+    return font
+
+class ImageCache:
+    """縮圖與詞綴圖示的兩層快取：記憶體保存已縮放的 QPixmap，磁碟保存以網址為鍵的原始圖檔"""
+
+    def __init__(self, disk_cache, memory_budget=IMAGE_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self._disk = disk_cache
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+    def get_cached_pixmap(self, url, size=40):
+        """從記憶體快取取得已縮放的圖片，只能在 GUI 執行緒呼叫（QPixmap 不可跨執行緒）"""
+        key = (url, size)
+        pixmap = self._memory.get(key)
+        if pixmap is not None:
+            self._memory.move_to_end(key)
+            metrics.count("image_memory.hit")
+        else:
+            metrics.count("image_memory.miss")
+        return pixmap
+
+    def put_pixmap(self, url, size, pixmap):
+        """將已縮放的圖片放入記憶體快取，只能在 GUI 執行緒呼叫"""
+        self._remember((url, size), pixmap)
+
+    def load_image(self, url, size=40):
+        """下載（或從磁碟快取讀取）並解碼、縮放圖片，可在背景執行緒呼叫"""
+        data = self.get_bytes(url)
+        with metrics.timer("image", "decode", bytes=len(data)):
+            image = QImage.fromData(data)
+            if image.isNull():
+                raise ValueError(f"無法解碼圖片: {url}")
+            return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    def get_bytes(self, url):
+        """取得原始圖檔，磁碟快取中沒有時才從網路下載"""
+        cached = self._disk.get(url) if self._disk else None
+        if cached:
+            metrics.count("image_disk.hit")
+            return cached[0]
+        metrics.count("image_disk.miss")
+        data = download_bytes(url)
+        if self._disk:
+            self._disk.put(url, data)
+        return data
+
+    def _remember(self, key, pixmap):
+        if key in self._memory:
+            self._memory_bytes -= self._pixmap_bytes(self._memory.pop(key))
+        self._memory[key] = pixmap
+        self._memory_bytes += self._pixmap_bytes(pixmap)
+        while self._memory_bytes > self.memory_budget and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= self._pixmap_bytes(evicted)
+
+    @staticmethod
+    def _pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+_image_cache = None
+
+def get_image_cache():
+    """取得共用的圖片快取，磁碟快取無法建立時只使用記憶體快取"""
+    global _image_cache
+    if _image_cache is None:
+        try:
+            disk_cache = DiskCache(os.path.join(get_cache_dir(), "images.sqlite3"), IMAGE_CACHE_MAX_BYTES)
+        except Exception as e:
+            print(f"無法建立圖片快取: {str(e)}")
+            disk_cache = None
+        _image_cache = ImageCache(disk_cache)
+    return _image_cache
+
+class ImageLoader(QObject):
+    """在背景執行緒下載並解碼圖片，完成後透過 signal 在 GUI 執行緒換上圖片"""
+    _image_ready = pyqtSignal(str, int, object)  # 網址, 尺寸, QImage（失敗時為 None）
+
+    def __init__(self, image_cache, max_workers=None, max_queued=None, parent=None):
+        super().__init__(parent)
+        self.image_cache = image_cache
+        # 預設值在建立時才讀取，執行期間修改模組常數也會生效
+        self.max_workers = max_workers if max_workers is not None else IMAGE_LOADER_WORKERS
+        self.max_queued = max_queued if max_queued is not None else IMAGE_LOADER_QUEUE_SIZE
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._queue = OrderedDict()  # 等待下載的 (網址, 尺寸)，依排入順序；取消時可直接移除
+        self._running = set()
+        self._waiters = {}  # (網址, 尺寸) -> [(owner, label, fallback_text)]
+        self._owners = {}  # owner -> {(網址, 尺寸)}
+        self._image_ready.connect(self._on_image_ready)
+
+    def load(self, url, label, owner, size=40, fallback_text="無縮圖"):
+        """為 label（或任何具有 setPixmap / setText 的物件）載入圖片；
+        已在記憶體快取中時立即顯示，否則排入背景佇列"""
+        pixmap = self.image_cache.get_cached_pixmap(url, size)
+        if pixmap is not None:
+            label.setPixmap(pixmap)
+            return
+
+        key = (url, size)
+        if key not in self._waiters:
+            if len(self._queue) >= self.max_queued:
+                # 佇列已滿，捨棄最早排入的載入；等待中的標籤改為替代文字，不會一直停在空白
+                self._finish(self._queue.popitem(last=False)[0], None)
+            self._waiters[key] = []
+            self._queue[key] = None
+        self._waiters[key].append((owner, label, fallback_text))
+        self._owners.setdefault(owner, set()).add(key)
+        self._pump()
+
+    def cancel(self, owner):
+        """取消 owner（通常是即將刪除的卡片）所有尚未完成的圖片載入"""
+        for key in self._owners.pop(owner, ()):
+            waiters = [waiter for waiter in self._waiters.get(key, []) if waiter[0] is not owner]
+            if waiters:
+                self._waiters[key] = waiters
+                continue
+            self._waiters.pop(key, None)
+            self._queue.pop(key, None)
+
+    def _pump(self):
+        while self._queue and len(self._running) < self.max_workers:
+            key = self._queue.popitem(last=False)[0]
+            self._running.add(key)
+            self._executor.submit(self._load, *key)
+
+    def _load(self, url, size):
+        try:
+            image = self.image_cache.load_image(url, size)
+        except Exception as e:
+            print(f"無法載入圖片 {url}: {str(e)}")
+            image = None
+        self._image_ready.emit(url, size, image)
+
+    def _on_image_ready(self, url, size, image):
+        key = (url, size)
+        self._running.discard(key)
+        pixmap = None
+        if image is not None:
+            pixmap = QPixmap.fromImage(image)
+            self.image_cache.put_pixmap(url, size, pixmap)
+        self._finish(key, pixmap)
+        self._pump()
+
+    def _finish(self, key, pixmap):
+        """把結果交給等待 key 的標籤：有圖片時換上圖片，否則顯示替代文字"""
+        for owner, label, fallback_text in self._waiters.pop(key, []):
+            owner_keys = self._owners.get(owner)
+            if owner_keys is not None:
+                owner_keys.discard(key)
+                if not owner_keys:
+                    del self._owners[owner]
+            try:
+                if pixmap is not None:
+                    label.setPixmap(pixmap)
+                else:
+                    label.setText(fallback_text)
+            except RuntimeError:
+                pass  # 標籤已被刪除
+
 class CharacterManagerWindow(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -131,6 +614,10 @@ class CharacterManagerWindow(QDialog):
         self.name_input.setPlaceholderText("角色名稱")
         input_layout.addWidget(self.name_input)
 
+        self.group_input = QLineEdit()
+        self.group_input.setPlaceholderText("群組 (可不填)")
+        input_layout.addWidget(self.group_input)
+
         add_button = QPushButton("新增")
         add_button.clicked.connect(self.add_character)
         input_layout.addWidget(add_button)
@@ -139,8 +626,8 @@ class CharacterManagerWindow(QDialog):
 
         # 角色名單表格
         self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["地區", "伺服器", "角色名稱"])
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["地區", "伺服器", "角色名稱", "群組", "優先順序", "公會"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
         self.table.setSelectionMode(QTableWidget.SingleSelection)
@@ -161,14 +648,19 @@ class CharacterManagerWindow(QDialog):
         self.delete_button.clicked.connect(self.delete_character)
         button_layout.addWidget(self.delete_button)
 
+        guild_button = QPushButton("匯入公會")
+        guild_button.clicked.connect(self.open_guild_import)
+        button_layout.addWidget(guild_button)
+
         save_button = QPushButton("儲存")
         save_button.clicked.connect(self.save_characters)
         button_layout.addWidget(save_button)
 
         self.layout.addLayout(button_layout)
 
-        # 載入角色名單
-        self.characters = []
+        # 載入角色名單；儲存時只將有變動的列寫回資料庫
+        self.store = get_roster_store()
+        self.entries = {}  # 資料庫 id -> 載入時的 RosterEntry
         self.load_characters()
 
     def center_window(self):
@@ -183,35 +675,36 @@ class CharacterManagerWindow(QDialog):
         self.move(window_geometry.topLeft())
 
     def load_characters(self):
-        self.characters = []
-        filepath = get_characters_file_path()
-        if not os.path.exists(filepath):
-            # 如果檔案不存在，創建一個空的 characters.txt
-            try:
-                with open(filepath, "w", encoding="utf-8") as file:
-                    file.write("# 角色資料格式：地區,伺服器,角色名稱\n")
-            except Exception as e:
-                QMessageBox.warning(self, "錯誤", f"無法創建角色檔案: {str(e)}")
-                return
-
-        try:
-            with open(filepath, "r", encoding="utf-8") as file:
-                for line in file:
-                    line = line.strip()
-                    if line and not line.startswith("#"):
-                        parts = line.split(",")
-                        if len(parts) == 3:
-                            region, realm, name = [p.strip() for p in parts]
-                            self.characters.append((region, realm, name))
-        except Exception as e:
-            QMessageBox.warning(self, "錯誤", f"無法讀取角色檔案: {str(e)}")
+        if self.store is None:
+            QMessageBox.warning(self, "錯誤", "無法開啟角色名單資料庫")
+            return
+        self.entries = {entry.id: entry for entry in self.store.entries(include_departed=True)}
 
         # 更新表格
-        self.table.setRowCount(len(self.characters))
-        for row, (region, realm, name) in enumerate(self.characters):
-            self.table.setItem(row, 0, QTableWidgetItem(region))
-            self.table.setItem(row, 1, QTableWidgetItem(realm))
-            self.table.setItem(row, 2, QTableWidgetItem(name))
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries.values()):
+            self.set_table_row(row, entry.region, entry.realm, entry.name, entry.group, entry.priority, entry.id)
+            guild_item = self.table.item(row, 5)
+            guild_item.setText(entry.guild + ("（已離開）" if entry.departed_at else ""))
+            if entry.departed_at:
+                guild_item.setForeground(QColor("#999999"))
+
+    def set_table_row(self, row, region, realm, name, group="", priority=0, entry_id=None):
+        """填入表格的一列；entry_id 記在第一欄，新加入尚未儲存的角色沒有 id"""
+        region_item = QTableWidgetItem(region)
+        if entry_id is None:
+            entry_id = self.table.item(row, 0).data(Qt.UserRole) if self.table.item(row, 0) else None
+        region_item.setData(Qt.UserRole, entry_id)
+        self.table.setItem(row, 0, region_item)
+        self.table.setItem(row, 1, QTableWidgetItem(realm))
+        self.table.setItem(row, 2, QTableWidgetItem(name))
+        self.table.setItem(row, 3, QTableWidgetItem(group))
+        self.table.setItem(row, 4, QTableWidgetItem(str(priority)))
+        if self.table.item(row, 5) is None:
+            # 公會欄由公會匯入維護，不開放編輯
+            guild_item = QTableWidgetItem("")
+            guild_item.setFlags(guild_item.flags() & ~Qt.ItemIsEditable)
+            self.table.setItem(row, 5, guild_item)
 
     def add_character(self):
         region = self.region_input.text().strip() or "tw"  # 預設為 tw
@@ -222,12 +715,9 @@ class CharacterManagerWindow(QDialog):
             QMessageBox.warning(self, "錯誤", "請填寫伺服器和角色名稱！")
             return
 
-        self.characters.append((region, realm, name))
         row = self.table.rowCount()
         self.table.insertRow(row)
-        self.table.setItem(row, 0, QTableWidgetItem(region))
-        self.table.setItem(row, 1, QTableWidgetItem(realm))
-        self.table.setItem(row, 2, QTableWidgetItem(name))
+        self.set_table_row(row, region, realm, name, self.group_input.text().strip())
 
         # 清空輸入框（除了地區，保持為 tw）
         self.realm_input.clear()
@@ -240,12 +730,10 @@ class CharacterManagerWindow(QDialog):
 
         if selected_rows:
             row = selected_rows[0].row()
-            region = self.table.item(row, 0).text()
-            realm = self.table.item(row, 1).text()
-            name = self.table.item(row, 2).text()
-            self.region_input.setText(region)
-            self.realm_input.setText(realm)
-            self.name_input.setText(name)
+            self.region_input.setText(self.table.item(row, 0).text())
+            self.realm_input.setText(self.table.item(row, 1).text())
+            self.name_input.setText(self.table.item(row, 2).text())
+            self.group_input.setText(self.table.item(row, 3).text())
 
     def edit_character(self):
         selected_rows = self.table.selectionModel().selectedRows()
@@ -261,10 +749,7 @@ class CharacterManagerWindow(QDialog):
             QMessageBox.warning(self, "錯誤", "請填寫伺服器和角色名稱！")
             return
 
-        self.characters[row] = (region, realm, name)
-        self.table.setItem(row, 0, QTableWidgetItem(region))
-        self.table.setItem(row, 1, QTableWidgetItem(realm))
-        self.table.setItem(row, 2, QTableWidgetItem(name))
+        self.set_table_row(row, region, realm, name, self.group_input.text().strip(), self.table.item(row, 4).text())
 
         # 清空輸入框（除了地區，保持為 tw）
         self.realm_input.clear()
@@ -277,81 +762,726 @@ class CharacterManagerWindow(QDialog):
             return
 
         row = selected_rows[0].row()
-        reply = QMessageBox.question(self, "確認", f"確定要刪除角色 {self.characters[row][2]} 嗎？",
+        reply = QMessageBox.question(self, "確認", f"確定要刪除角色 {self.table.item(row, 2).text()} 嗎？",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.characters.pop(row)
             self.table.removeRow(row)
             self.region_input.setText("tw")  # 恢復預設值
             self.realm_input.clear()
             self.name_input.clear()
+            self.group_input.clear()
             self.table.clearSelection()
 
-    def save_characters(self):
-        # 從表格獲取資料
-        self.characters = []
+    def collect_changes(self):
+        """比對表格與載入時的資料，回傳 (新增, 修改, 刪除) 的角色"""
+        added, updated, kept = [], [], set()
         for row in range(self.table.rowCount()):
+            entry_id = self.table.item(row, 0).data(Qt.UserRole)
             region = self.table.item(row, 0).text().strip() or "tw"  # 預設為 tw
             realm = self.table.item(row, 1).text().strip()
             name = self.table.item(row, 2).text().strip()
-            if realm and name:  # 確保伺服器和角色名稱不為空
-                self.characters.append((region, realm, name))
+            group = self.table.item(row, 3).text().strip()
+            try:
+                priority = int(self.table.item(row, 4).text().strip() or 0)
+            except ValueError:
+                priority = 0
+            if not realm or not name:  # 伺服器或角色名稱為空的列視為刪除
+                continue
+            if entry_id is None:
+                added.append((region, realm, name, group, priority))
+                continue
+            kept.add(entry_id)
+            entry = self.entries[entry_id]
+            if (region, realm, name, group, priority) != (entry.region, entry.realm, entry.name, entry.group, entry.priority):
+                updated.append((entry_id, region, realm, name, group, priority))
+        removed = [entry_id for entry_id in self.entries if entry_id not in kept]
+        return added, updated, removed
 
+    def save_characters(self):
+        if self.store is None:
+            QMessageBox.warning(self, "錯誤", "無法開啟角色名單資料庫")
+            return
+
+        # 只寫回新增、修改與刪除的角色
         try:
-            filepath = get_characters_file_path()
-            with open(filepath, "w", encoding="utf-8") as file:
-                file.write("# 角色資料格式：地區,伺服器,角色名稱\n")
-                for region, realm, name in self.characters:
-                    file.write(f"{region},{realm},{name}\n")
+            self.store.apply_changes(*self.collect_changes())
             QMessageBox.information(self, "成功", "角色資料已儲存！")
             self.accept()  # 關閉視窗
         except Exception as e:
-            QMessageBox.warning(self, "錯誤", f"無法儲存角色檔案: {str(e)}")
+            QMessageBox.warning(self, "錯誤", f"無法儲存角色資料: {str(e)}")
+
+    def open_guild_import(self):
+        if self.store is None:
+            QMessageBox.warning(self, "錯誤", "無法開啟角色名單資料庫")
+            return
+
+        # 匯入會直接寫入資料庫，先儲存表格中尚未儲存的變更，避免重新載入時遺失
+        changes = self.collect_changes()
+        if any(changes):
+            reply = QMessageBox.question(self, "確認", "匯入公會前會先儲存目前的變更，是否繼續？",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+            try:
+                self.store.apply_changes(*changes)
+            except Exception as e:
+                QMessageBox.warning(self, "錯誤", f"無法儲存角色資料: {str(e)}")
+                return
+
+        GuildImportDialog(self, self.region_input.text().strip() or "tw", self.realm_input.text().strip()).exec_()
+        self.load_characters()
+
+class DiagnosticsDialog(QDialog):
+    """顯示效能統計摘要，可開關統計、清除紀錄與匯出 JSON lines"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("效能診斷")
+        self.setWindowFlags(Qt.WindowCloseButtonHint | Qt.Dialog)
+        self.resize(600, 300)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(10)
+
+        self.summary_text = QPlainTextEdit()
+        self.summary_text.setReadOnly(True)
+        self.summary_text.setObjectName("diagnosticsSummary")
+        layout.addWidget(self.summary_text)
+
+        button_layout = QHBoxLayout()
+        self.toggle_button = QPushButton()
+        self.toggle_button.clicked.connect(self.toggle_metrics)
+        button_layout.addWidget(self.toggle_button)
+
+        refresh_button = QPushButton("重新整理")
+        refresh_button.clicked.connect(self.refresh)
+        button_layout.addWidget(refresh_button)
+
+        clear_button = QPushButton("清除")
+        clear_button.clicked.connect(self.clear_metrics)
+        button_layout.addWidget(clear_button)
+
+        export_button = QPushButton("匯出 JSONL")
+        export_button.clicked.connect(self.export_metrics)
+        button_layout.addWidget(export_button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def refresh(self):
+        self.toggle_button.setText("停止統計" if metrics.enabled else "開始統計")
+        self.summary_text.setPlainText(metrics.format_summary())
+
+    def toggle_metrics(self):
+        metrics.enabled = not metrics.enabled
+        self.refresh()
+
+    def clear_metrics(self):
+        metrics.reset()
+        self.refresh()
+
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "匯出效能統計", "raiderio-metrics.jsonl", "JSON Lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            count = metrics.export_jsonl(path)
+            QMessageBox.information(self, "成功", f"已匯出 {count} 筆紀錄")
+        except Exception as e:
+            QMessageBox.warning(self, "錯誤", f"無法匯出效能統計: {str(e)}")
+
+class GuildImportDialog(QDialog):
+    """以一次公會查詢批次匯入成員，可依等級與階級篩選；已不在公會的角色會標記為離開"""
+
+    def __init__(self, parent=None, region="tw", realm=""):
+        super().__init__(parent)
+        self.setWindowTitle("匯入公會")
+        self.setWindowFlags(Qt.WindowCloseButtonHint | Qt.Dialog)
+        self.fetcher = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(10)
+
+        input_layout = QHBoxLayout()
+        self.region_input = QLineEdit(region)
+        self.region_input.setPlaceholderText("地區 (預設為 tw)")
+        input_layout.addWidget(self.region_input)
+
+        self.realm_input = QLineEdit(realm)
+        self.realm_input.setPlaceholderText("伺服器 (例如 illidan)")
+        input_layout.addWidget(self.realm_input)
+
+        self.guild_input = QLineEdit()
+        self.guild_input.setPlaceholderText("公會名稱")
+        input_layout.addWidget(self.guild_input)
+        layout.addLayout(input_layout)
+
+        filter_layout = QHBoxLayout()
+        self.min_level_input = QLineEdit()
+        self.min_level_input.setPlaceholderText("最低等級 (可不填)")
+        filter_layout.addWidget(self.min_level_input)
+
+        self.max_rank_input = QLineEdit()
+        self.max_rank_input.setPlaceholderText("最低階級，會長為 0 (可不填)")
+        filter_layout.addWidget(self.max_rank_input)
+
+        self.import_button = QPushButton("匯入")
+        self.import_button.clicked.connect(self.start_import)
+        filter_layout.addWidget(self.import_button)
+        layout.addLayout(filter_layout)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+    def start_import(self):
+        region = self.region_input.text().strip() or "tw"  # 預設為 tw
+        realm = self.realm_input.text().strip()
+        guild_name = self.guild_input.text().strip()
+        if not realm or not guild_name:
+            QMessageBox.warning(self, "錯誤", "請填寫伺服器和公會名稱！")
+            return
+        try:
+            min_level = int(self.min_level_input.text()) if self.min_level_input.text().strip() else None
+            max_rank = int(self.max_rank_input.text()) if self.max_rank_input.text().strip() else None
+        except ValueError:
+            QMessageBox.warning(self, "錯誤", "等級與階級必須是數字！")
+            return
+
+        self.import_button.setEnabled(False)
+        self.status_label.setText("正在查詢公會成員...")
+        self.fetcher = GuildImportFetcher(region, realm, guild_name, min_level, max_rank)
+        self.fetcher.imported.connect(self.import_finished)
+        self.fetcher.import_failed.connect(self.import_failed)
+        self.fetcher.start()
+
+    def done(self, result):
+        # 查詢進行中關閉視窗時，等待背景執行緒結束後再關閉
+        if self.fetcher is not None and self.fetcher.isRunning():
+            self.fetcher.wait()
+        super().done(result)
+
+    def import_finished(self, added, departed):
+        QMessageBox.information(self, "成功", f"新增 {added} 名角色，{departed} 名角色已離開公會")
+        self.accept()
+
+    def import_failed(self, message):
+        self.import_button.setEnabled(True)
+        self.status_label.setText(f"無法匯入公會: {message}")
 
 class DataFetcher(QThread):
     data_fetched = pyqtSignal(list)
+    character_fetched = pyqtSignal(int, tuple)  # 名單索引, (region, realm, name, result)
+    progress = pyqtSignal(int, int)  # 已完成數量, 總數
 
-    def __init__(self, characters):
+    def __init__(self, characters, max_workers=MAX_CONCURRENT_REQUESTS, reuse=None, timeout=REFRESH_TIMEOUT,
+                 tiers=None):
         super().__init__()
         self.characters = characters
+        self.max_workers = max(1, max_workers)
+        # 被取代的更新已完成的角色 {(region, realm, name): CharacterProfile}，包含需要的資料層時不再重新查詢
+        self.reuse = reuse or {}
+        # 各角色要查詢的資料層（與 characters 對應），None 表示全部
+        self.tiers = tiers
+        self.token = CancelToken(timeout)
+        self.results = [None] * len(characters)
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def cancel(self):
+        """要求停止更新（可在其他執行緒呼叫）；之後不再送出任何結果"""
+        self.token.cancel()
+
+    def completed_results(self):
+        """目前已成功查詢的角色 {(region, realm, name): CharacterProfile}"""
+        return {entry[:3]: entry[3] for entry in list(self.results)
+                if entry is not None and entry[3].error is None}
+
+    def run(self):
+        # 每完成一個角色就先送出結果，最後再依名單順序送出完整列表；
+        # 查詢與解析都在 raiderio_core 的執行緒池完成，介面只讀取 CharacterProfile
+        results = self.results
+        total = len(self.characters)
+        completed = 0
+        pending = []
+        for idx, char_key in enumerate(self.characters):
+            profile = self.reuse.get(char_key)
+            if profile is None or (self.tiers is not None and not set(self.tiers[idx]) <= set(profile.tiers)):
+                pending.append(idx)
+                continue
+            results[idx] = char_key + (profile,)
+            completed += 1
+            self.character_fetched.emit(idx, results[idx])
+            self.progress.emit(completed, total)
+
+        fetched = []
+        tiers = [self.tiers[idx] for idx in pending] if self.tiers is not None else None
+        for position, profile in fetch_roster([self.characters[idx] for idx in pending], self.max_workers, self.token,
+                                              tiers):
+            if self.token.cancelled:
+                break
+            idx = pending[position]
+            results[idx] = self.characters[idx] + (profile,)
+            fetched.append(profile)
+            completed += 1
+            self.character_fetched.emit(idx, results[idx])
+            self.progress.emit(completed, total)
+        if not self.token.cancelled:
+            self.data_fetched.emit(results)
+        # 取消前已完成的角色仍然記錄（沿用的結果已由原本的更新記錄）
+        record_fetch_results(fetched)
+
+class AutoRefreshScheduler(QObject):
+    """背景自動更新：把一個週期內需要的查詢平均分散到各次計時，每次只查詢逾期最久的少數角色，
+    不會在週期開始時一次查詢整份名單。視窗最小化時暫停"""
+    character_fetched = pyqtSignal(tuple)  # (region, realm, name, result)
+
+    def __init__(self, is_busy, interval=AUTO_REFRESH_INTERVAL, tiers_for=None, parent=None):
+        super().__init__(parent)
+        self.is_busy = is_busy
+        self.tiers_for = tiers_for  # 角色 -> 需要查詢的資料層，None 表示全部
+        self.interval = interval
+        self.characters = []
+        self.batch_size = 1
+        self.paused = False
+        self.fetcher = None
+        self.attempted = {}  # key -> 上次嘗試查詢的時間，查詢失敗的角色不會每次都被重試
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+
+    def set_characters(self, characters):
+        self.characters = list(characters)
+        self.reschedule()
+
+    def reschedule(self):
+        """依名單大小決定計時間隔與每次查詢的角色數量，讓整份名單的查詢平均分布在一個週期內"""
+        if self.interval <= 0 or self.paused or not self.characters:
+            self.timer.stop()
+            return
+        tick = max(AUTO_REFRESH_MIN_TICK, self.interval / len(self.characters))
+        self.batch_size = max(1, round(len(self.characters) * tick / self.interval))
+        self.timer.start(int(tick * 1000))
+
+    def pause(self):
+        self.paused = True
+        self.timer.stop()
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self.reschedule()
+
+    def cancel(self):
+        """停止進行中的背景查詢，回傳其已完成的結果供手動更新沿用"""
+        job = self.fetcher
+        self.fetcher = None
+        if job is None or not job.isRunning():
+            return {}
+        job.cancel()
+        return job.completed_results()
+
+    def emit_result(self, job, entry):
+        # 已被取消或取代的查詢稍後送達的結果一律略過
+        if job is self.fetcher and not job.cancelled:
+            self.character_fetched.emit(entry)
+
+    def tick(self):
+        if self.is_busy() or (self.fetcher is not None and self.fetcher.isRunning()):
+            return
+        store = get_roster_store()
+        if store is None:
+            return  # 沒有名單資料庫時無法得知上次查詢時間
+        wanted = set(self.characters)
+        entries = [entry for entry in store.entries() if entry.key in wanted]
+        due = due_for_refresh(entries, self.interval, limit=self.batch_size, attempted=self.attempted)
+        if not due:
+            return
+        now = time.time()
+        for key in due:
+            self.attempted[key] = now
+        job = self.fetcher = DataFetcher(due, max_workers=len(due),
+                                         tiers=[self.tiers_for(key) for key in due] if self.tiers_for else None)
+        job.character_fetched.connect(lambda idx, entry: self.emit_result(job, entry))
+        job.start()
+
+class AffixFetcher(QThread):
+    affixes_fetched = pyqtSignal(dict)
+    fetch_failed = pyqtSignal(str)
+
+    def __init__(self, region):
+        super().__init__()
+        self.region = region
 
     def run(self):
-        results = []
-        for region, realm, name in self.characters:
-            result = self.fetch_character_data(region, realm, name)
-            results.append((region, realm, name, result))
-        self.data_fetched.emit(results)
-
-    def fetch_character_data(self, region, realm, character_name):
-        base_url = "https://raider.io/api/v1/characters/profile"
-        params = {
-            "region": region,
-            "realm": realm,
-            "name": character_name,
-            "fields": "mythic_plus_scores_by_season:current,mythic_plus_best_runs,mythic_plus_recent_runs,thumbnail_url,class"
-        }
         try:
-            response = requests.get(base_url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            self.affixes_fetched.emit(fetch_affixes(self.region))
         except Exception as e:
-            return {"error": str(e)}
+            self.fetch_failed.emit(str(e))
 
-    @staticmethod
-    def format_time(milliseconds):
-        seconds = milliseconds / 1000
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-    
-    @staticmethod
-    def format_datetime(datetime_str):
+class TierFetcher(QThread):
+    """展開卡片或副本詳細紀錄時，在背景補查單一角色缺少的資料層"""
+    character_fetched = pyqtSignal(tuple)  # (region, realm, name, result)
+
+    def __init__(self, char_key, tiers, parent=None):
+        super().__init__(parent)
+        self.char_key = char_key
+        self.tiers = tiers
+        self.token = CancelToken(CHARACTER_TIMEOUT * 2)
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def cancel(self):
+        self.token.cancel()
+
+    def run(self):
+        profile = fetch_character_profile(*self.char_key, token=self.token, tiers=self.tiers)
+        record_fetch_results([profile])
+        self.character_fetched.emit(self.char_key + (profile,))
+
+class GuildImportFetcher(QThread):
+    imported = pyqtSignal(int, int)  # 新增數量, 標記離開數量
+    import_failed = pyqtSignal(str)
+
+    def __init__(self, region, realm, guild_name, min_level=None, max_rank=None):
+        super().__init__()
+        self.args = (region, realm, guild_name, min_level, max_rank)
+
+    def run(self):
         try:
-            dt = datetime.strptime(datetime_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-            return dt.strftime("%Y/%m/%d %H:%M")
-        except Exception:
-            return datetime_str
+            self.imported.emit(*import_guild(*self.args))
+        except Exception as e:
+            self.import_failed.emit(str(e))
+
+class ExpansionStateStore:
+    """角色卡片與副本詳細紀錄的展開狀態，在切換時即時記錄，不需走訪元件樹
+
+    角色的鍵為 (region, realm, name)，副本的鍵為 (region, realm, name, dungeon)。
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._open_children = Counter()  # 角色 -> 展開中的副本數量
+
+    def is_expanded(self, key, default=False):
+        return self._states.get(key, default)
+
+    def set_expanded(self, key, expanded):
+        if len(key) > 3 and self._states.get(key, False) != expanded:
+            self._open_children[key[:3]] += 1 if expanded else -1
+        self._states[key] = expanded
+
+    def has_expanded_children(self, key):
+        """角色底下是否有展開中的副本詳細紀錄"""
+        return self._open_children[key] > 0
+
+class RosterNode:
+    """RosterModel 的樹狀節點：角色 → 副本最佳紀錄 → 最近紀錄"""
+    CHARACTER, DUNGEON, RUN, MESSAGE = range(4)
+
+    __slots__ = ("kind", "key", "parent", "row", "children", "texts", "colors", "info")
+
+    def __init__(self, kind, key=None, parent=None, texts=None, colors=None):
+        self.kind = kind
+        self.key = key
+        self.parent = parent
+        self.row = 0
+        self.children = []
+        self.texts = texts or [""] * len(RosterModel.HEADERS)
+        self.colors = colors or [None] * len(RosterModel.HEADERS)
+        self.info = {}
+
+    def set_children(self, children):
+        for row, child in enumerate(children):
+            child.parent = self
+            child.row = row
+        self.children = children
+
+class _ThumbnailTarget:
+    """讓 ImageLoader 把縮圖交給 RosterModel 的轉接物件（取代 QLabel）"""
+    __slots__ = ("model", "node")
+
+    def __init__(self, model, node):
+        self.model = model
+        self.node = node
+
+    def setPixmap(self, pixmap):
+        self.model.set_thumbnail(self.node, pixmap)
+
+    def setText(self, text):
+        pass
+
+class RosterModel(QAbstractItemModel):
+    """角色 → 副本 → 最近紀錄的樹狀資料模型，搭配 QTreeView 只繪製可見的列"""
+    HEADERS = ["副本", "層數", "分數", "鑰石", "通關時間", "完成日期"]
+    COLUMN_WIDTHS = [220, 60, 60, 60, 80, 140]
+
+    def __init__(self, image_loader, score_color, level_color, parent=None):
+        super().__init__(parent)
+        self.image_loader = image_loader
+        self.score_color = score_color
+        self.level_color = level_color
+        self.root = RosterNode(RosterNode.MESSAGE)
+        self.nodes = {}  # (region, realm, name) -> 角色節點，列依排序移動後仍能以角色尋找
+
+    # --- QAbstractItemModel 介面 ---
+    def index(self, row, column, parent=QModelIndex()):
+        node = parent.internalPointer() if parent.isValid() else self.root
+        if 0 <= row < len(node.children) and 0 <= column < len(self.HEADERS):
+            return self.createIndex(row, column, node.children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent_node = index.internalPointer().parent
+        if parent_node is None or parent_node is self.root:
+            return QModelIndex()
+        return self.createIndex(parent_node.row, 0, parent_node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = parent.internalPointer() if parent.isValid() else self.root
+        return len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        if role == Qt.DisplayRole:
+            return node.texts[column]
+        if role == Qt.ForegroundRole and node.colors[column]:
+            return QColor(node.colors[column])
+        if role == Qt.DecorationRole and node.kind == RosterNode.CHARACTER and column == 0:
+            return node.info.get("thumbnail")
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignLeft | Qt.AlignVCenter) if column == 0 else int(Qt.AlignCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled if index.isValid() else Qt.NoItemFlags
+
+    # --- 資料更新 ---
+    def set_placeholders(self, characters):
+        """以佔位列重建名單，查詢完成後再以 update_character 逐一填入"""
+        self.beginResetModel()
+        self.image_loader.cancel(self)
+        nodes = []
+        for region, realm, name in characters:
+            node = RosterNode(RosterNode.CHARACTER, (region, realm, name))
+            node.texts[0] = name
+            node.info = {"realm": f"{region}-{realm}", "score": "載入中...", "score_color": "#999999",
+                         "class_color": "#FFFFFF"}
+            nodes.append(node)
+        self.root.set_children(nodes)
+        self.nodes = {node.key: node for node in nodes}
+        self.endResetModel()
+
+    def set_results(self, results):
+        self.set_placeholders([(region, realm, name) for region, realm, name, _ in results])
+        for idx, entry in enumerate(results):
+            self.update_character(idx, entry)
+
+    def clear(self):
+        self.set_placeholders([])
+
+    def set_order(self, keys):
+        """依 keys 的順序重新排列角色列，不重建節點；展開狀態隨 persistent index 保留"""
+        nodes = [self.nodes[key] for key in keys if key in self.nodes]
+        if len(nodes) != len(self.root.children) or nodes == self.root.children:
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        self.root.set_children(nodes)
+        self.changePersistentIndexList(persistent, [
+            self.createIndex(index.internalPointer().row, index.column(), index.internalPointer())
+            for index in persistent])
+        self.layoutChanged.emit()
+
+    def mark_unloaded(self):
+        """把仍在等待資料的角色列標示為未載入（更新已取消），回傳其數量"""
+        count = 0
+        for node in self.root.children:
+            if "profile" not in node.info:
+                node.info["score"] = "未載入"
+                self.dataChanged.emit(self.createIndex(node.row, 0, node),
+                                      self.createIndex(node.row, len(self.HEADERS) - 1, node))
+                count += 1
+        return count
+
+    @timed("render", "view_row")
+    def update_character(self, idx, entry):
+        """以查詢結果替換角色的內容與其副本子節點；idx 為名單索引，列可能已依排序移動，以角色尋找節點"""
+        node = self.nodes.get(tuple(entry[:3]))
+        if node is None:
+            return
+        idx = node.row
+        parent_index = self.createIndex(idx, 0, node)
+        if node.children:
+            self.beginRemoveRows(parent_index, 0, len(node.children) - 1)
+            node.set_children([])
+            self.endRemoveRows()
+
+        children = self._fill_character(node, *entry)
+        if children:
+            self.beginInsertRows(parent_index, 0, len(children) - 1)
+            node.set_children(children)
+            self.endInsertRows()
+        self.dataChanged.emit(parent_index, self.createIndex(idx, len(self.HEADERS) - 1, node))
+
+    def set_thumbnail(self, node, pixmap):
+        node.info["thumbnail"] = pixmap
+        if node.row < len(self.root.children) and self.root.children[node.row] is node:
+            index = self.createIndex(node.row, 0, node)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def _fill_character(self, node, region, realm, name, profile):
+        node.info = {"realm": f"{region}-{realm}", "class_color": CLASS_COLORS.get(profile.class_name, "#FFFFFF")}
+        if profile.score is not None:
+            node.info["score"] = f"{profile.score:.1f}"
+            node.info["score_color"] = self.score_color(profile.score)
+        else:
+            node.info["score"] = "N/A"
+            node.info["score_color"] = "#999999"
+
+        if profile.thumbnail_url:
+            self.image_loader.load(profile.thumbnail_url, _ThumbnailTarget(self, node), self, 40)
+
+        node.info["profile"] = profile
+
+        if profile.error is not None:
+            return [self._message("錯誤: " + profile.error, "#FF5555")]
+        if "best" not in profile.tiers:
+            return [self._message("載入中...")]  # 最佳紀錄在展開時才查詢
+        if not profile.dungeons:
+            return [self._message("無紀錄")]
+
+        dungeons = []
+        for summary in profile.dungeons.values():
+            dungeon = RosterNode(RosterNode.DUNGEON, node.key + (summary.name,))
+            self._fill_run(dungeon, summary.best_run)
+            dungeon.texts[0] = summary.display_name
+            if summary.best_run.score is not None:
+                dungeon.texts[2] = f"{summary.best_run.score:.1f}"
+                dungeon.colors[2] = self.score_color(summary.best_run.score)
+            else:
+                dungeon.texts[2] = "N/A"
+                dungeon.colors[2] = "#FFFFFF"
+
+            run_nodes = []
+            for recent_run in summary.recent_runs:
+                run_node = RosterNode(RosterNode.RUN)
+                self._fill_run(run_node, recent_run)
+                run_nodes.append(run_node)
+            if "recent" not in profile.tiers:
+                run_nodes.append(self._message("載入中..."))  # 最近紀錄在展開時才查詢
+            elif not run_nodes:
+                run_nodes.append(self._message("無最近紀錄"))
+            dungeon.set_children(run_nodes)
+            dungeons.append(dungeon)
+        return dungeons
+
+    @staticmethod
+    def _message(text, color="#999999"):
+        message = RosterNode(RosterNode.MESSAGE)
+        message.texts[0] = text
+        message.colors[0] = color
+        return message
+
+    def _fill_run(self, run_node, run):
+        run_node.texts[1] = str(run.mythic_level)
+        run_node.colors[1] = self.level_color(run.mythic_level)
+        if run.keystone_upgrades > 0:
+            run_node.texts[3] = f"✓ +{run.keystone_upgrades}"
+            run_node.colors[3] = "#67FD0A"
+        else:
+            run_node.texts[3] = "✗ 超時"
+            run_node.colors[3] = "#FF5555"
+        run_node.texts[4] = run.time_text
+        run_node.texts[5] = run.date_text
+
+class RosterDelegate(QStyledItemDelegate):
+    """RosterModel 的繪製器，沿用卡片介面的配色與字型"""
+    ROW_BACKGROUNDS = {
+        RosterNode.DUNGEON: "#202830",
+        RosterNode.RUN: "#1A2029",
+        RosterNode.MESSAGE: "#1D2128",
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name_font = get_font(14, True)
+        self.realm_font = get_font(12)
+        self.score_font = get_font(16, True)
+        self.cell_font = get_font()
+        self.bold_cell_font = get_font(10, True)
+
+    def sizeHint(self, option, index):
+        node = index.internalPointer()
+        return QSize(option.rect.width(), 70 if node.kind == RosterNode.CHARACTER else 32)
+
+    def paint(self, painter, option, index):
+        node = index.internalPointer()
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        if node.kind == RosterNode.CHARACTER:
+            self._paint_character(painter, option.rect, node)
+        else:
+            painter.fillRect(option.rect, QColor(self.ROW_BACKGROUNDS[node.kind]))
+            column = index.column()
+            bold = column in (1, 2, 3) or (node.kind == RosterNode.DUNGEON and column == 0)
+            painter.setFont(self.bold_cell_font if bold else self.cell_font)
+            painter.setPen(QColor(node.colors[column] or "#FFFFFF"))
+            alignment = Qt.AlignLeft | Qt.AlignVCenter if column == 0 else Qt.AlignCenter
+            painter.drawText(option.rect.adjusted(5, 0, -2, 0), alignment, node.texts[column])
+        painter.restore()
+
+    def _paint_character(self, painter, rect, node):
+        card = rect.adjusted(0, 3, -2, -3)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#252C38"))
+        painter.drawRoundedRect(card, 6, 6)
+
+        x = card.left() + 15
+        thumbnail = node.info.get("thumbnail")
+        if thumbnail is not None:
+            painter.drawPixmap(x, card.center().y() - thumbnail.height() // 2, thumbnail)
+        x += 50
+
+        painter.setFont(self.name_font)
+        painter.setPen(QColor(node.info.get("class_color", "#FFFFFF")))
+        name_rect = painter.boundingRect(QRect(x, card.top(), card.width(), card.height()),
+                                         Qt.AlignLeft | Qt.AlignVCenter, node.texts[0])
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter, node.texts[0])
+
+        painter.setFont(self.realm_font)
+        painter.setPen(QColor("#999999"))
+        painter.drawText(QRect(name_rect.right() + 10, card.top(), card.width(), card.height()),
+                         Qt.AlignLeft | Qt.AlignVCenter, node.info.get("realm", ""))
+
+        painter.setFont(self.score_font)
+        score_text = node.info.get("score", "")
+        score_rect = painter.boundingRect(card, Qt.AlignRight | Qt.AlignVCenter, score_text).adjusted(-10, -5, 10, 5)
+        score_rect.moveRight(card.right() - 15)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#1D2128"))
+        painter.drawRoundedRect(score_rect, 4, 4)
+        painter.setPen(QColor(node.info.get("score_color", "#FFFFFF")))
+        painter.drawText(score_rect, Qt.AlignCenter, score_text)
 
 class RaiderIOMainWindow(QMainWindow):
     def __init__(self):
@@ -359,37 +1489,14 @@ class RaiderIOMainWindow(QMainWindow):
         self.setWindowTitle("Raider.IO Mythic+ 查詢工具")
         self.setGeometry(100, 100, 1000, 800)
 
-        # 設置視窗圖標和工作列圖標
-        icon_path = resource_path("icon.ico")
-        print("視窗圖標路徑:", icon_path)
-        icon = QIcon(icon_path)
-        if icon.isNull():
-            print("視窗圖標載入失敗:", icon_path)
-        else:
-            print("視窗圖標載入成功:", icon_path)
-        self.setWindowIcon(icon)
+        # 視窗圖標、字型與詞綴在首次繪製後才載入（見 finish_startup）
+        self.first_paint_done = False
 
         # 將視窗移到螢幕中心
         self.center_window()
 
-        # 設置視窗背景顏色，與程式內部一致
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #0f1318;
-                color: #ffffff;
-            }
-            QWidget {
-                background-color: #0f1318;
-                color: #ffffff;
-            }
-            QScrollArea {
-                border: none;
-                background-color: #0f1318;
-            }
-            QLabel {
-                color: #ffffff;
-            }
-        """)
+        # 所有元件的外觀由全域樣式表決定（見 THEME_STYLESHEET）
+        apply_theme(QApplication.instance())
 
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
@@ -402,73 +1509,43 @@ class RaiderIOMainWindow(QMainWindow):
         header_layout.setContentsMargins(0, 0, 0, 0)
         
         logo_label = QLabel("上班摸魚做ㄉ")
-        logo_label.setFont(QFont("Arial", 18, QFont.Bold))
-        logo_label.setStyleSheet("color: #FF9A00;")
+        logo_label.setObjectName("logoLabel")
+        logo_label.setFont(get_font(18, True, "Arial"))
         header_layout.addWidget(logo_label)
         
         header_layout.addStretch()
 
+        # 縮圖與詞綴圖示在背景執行緒載入，避免阻塞介面
+        self.image_loader = ImageLoader(get_image_cache(), parent=self)
+
         # 添加詞綴顯示區域，放在「更新資料」按鈕的左邊
         self.affixes_frame = QFrame()
-        self.affixes_frame.setStyleSheet("background-color: #252C38; border-radius: 4px; padding: 2px;")
+        self.affixes_frame.setObjectName("affixesFrame")
         self.affixes_layout = QHBoxLayout(self.affixes_frame)
         self.affixes_layout.setContentsMargins(5, 0, 5, 0)
         self.affixes_layout.setSpacing(5)
         header_layout.addWidget(self.affixes_frame)
-        self.load_affixes()  # 載入本週詞綴
 
         # 在詞綴區塊和「更新資料」按鈕之間添加間距，向左移動詞綴區塊
         header_layout.addSpacing(20)  # 添加 20 像素間距，讓詞綴區塊更靠近左邊
         
         self.update_button = QPushButton()
-        self.update_button.setFont(QFont("Noto Sans TC", 11))
+        self.update_button.setObjectName("headerButton")
+        self.update_button.setFont(get_font(11))
         self.update_button.setCursor(Qt.PointingHandCursor)
         self.update_button.setMinimumHeight(40)
         self.update_button.setFixedWidth(40)  # 設置按鈕為正方形
-        self.update_button.setIcon(QIcon(resource_path("refresh.ico")))  # 使用自訂圖示
-        self.update_button.setStyleSheet("""
-            QPushButton {
-                background-color: #FF9A00;
-                color: #ffffff;
-                padding: 8px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #FF8500;
-            }
-            QPushButton:pressed {
-                background-color: #E07800;
-            }
-            QPushButton:disabled {
-                background-color: #555555;
-                color: #888888;
-            }
-        """)
-        self.update_button.clicked.connect(self.update_data)
+        self.update_button.setIcon(get_refresh_icon())  # 使用自訂圖示
+        self.update_button.clicked.connect(self.toggle_update)
         header_layout.addWidget(self.update_button)
 
         # 新增「+」按鍵
         self.add_character_button = QPushButton("+")
-        self.add_character_button.setFont(QFont("Noto Sans TC", 11))
+        self.add_character_button.setObjectName("headerButton")
+        self.add_character_button.setFont(get_font(11))
         self.add_character_button.setCursor(Qt.PointingHandCursor)
         self.add_character_button.setMinimumHeight(40)
         self.add_character_button.setFixedWidth(40)
-        self.add_character_button.setStyleSheet("""
-            QPushButton {
-                background-color: #FF9A00;
-                color: #ffffff;
-                padding: 8px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #FF8500;
-            }
-            QPushButton:pressed {
-                background-color: #E07800;
-            }
-        """)
         self.add_character_button.clicked.connect(self.open_character_manager)
         header_layout.addWidget(self.add_character_button)
         
@@ -477,33 +1554,17 @@ class RaiderIOMainWindow(QMainWindow):
         separator = QFrame()
         separator.setFrameShape(QFrame.HLine)
         separator.setFrameShadow(QFrame.Sunken)
-        separator.setStyleSheet("background-color: #2A2F36; min-height: 2px;")
+        separator.setObjectName("headerSeparator")
         main_layout.addWidget(separator)
+
+        # 搜尋、篩選與排序只查詢記憶體中的索引，不重建卡片
+        self.roster_index = RosterIndex()
+        self.roster_filter = RosterFilter()
+        main_layout.addWidget(self.create_filter_bar())
         
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea { 
-                background-color: #0f1318; 
-                border: none; 
-            }
-            QScrollBar:vertical { 
-                background: #1D2128; 
-                width: 12px; 
-                margin: 0px; 
-            }
-            QScrollBar::handle:vertical { 
-                background: #434953; 
-                min-height: 20px; 
-                border-radius: 6px; 
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical { 
-                height: 0px; 
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        self.scroll_area.setObjectName("cardScrollArea")
         
         self.scroll_content = QWidget()
         self.scroll_layout = QVBoxLayout(self.scroll_content)
@@ -511,15 +1572,82 @@ class RaiderIOMainWindow(QMainWindow):
         self.scroll_layout.setSpacing(20)
         self.scroll_area.setWidget(self.scroll_content)
         
-        main_layout.addWidget(self.scroll_area)
+        if RENDER_ENGINE == "view":
+            # 以 QTreeView 取代卡片捲動區，角色列橫跨所有欄位並由 RosterDelegate 繪製
+            self.roster_model = RosterModel(self.image_loader, self.get_score_color, self.get_level_color, self)
+            self.roster_view = QTreeView()
+            self.roster_view.setModel(self.roster_model)
+            self.roster_view.setItemDelegate(RosterDelegate(self.roster_view))
+            self.roster_view.setSelectionMode(QTreeView.NoSelection)
+            self.roster_view.setExpandsOnDoubleClick(False)
+            self.roster_view.setIndentation(12)
+            self.roster_view.setObjectName("rosterView")
+            self.roster_view.header().setStretchLastSection(False)
+            for column, width in enumerate(RosterModel.COLUMN_WIDTHS):
+                self.roster_view.setColumnWidth(column, width)
+            self.roster_view.clicked.connect(self.toggle_view_row)
+            self.roster_view.expanded.connect(lambda index: self.record_view_expansion(index, True))
+            self.roster_view.collapsed.connect(lambda index: self.record_view_expansion(index, False))
+            self.roster_model.rowsInserted.connect(self.restore_view_expansion)
+            self.roster_model.modelReset.connect(self.restore_view_expansion)
+            main_layout.addWidget(self.roster_view)
+        else:
+            self.roster_model = None
+            self.roster_view = None
+            main_layout.addWidget(self.scroll_area)
         
         self.status_bar = self.statusBar()
-        self.status_bar.setStyleSheet("background-color: #16181D; color: #999999; padding: 5px;")
+
+        # 效能統計：滑鼠移到按鈕上顯示摘要，點擊開啟診斷視窗
+        self.diagnostics_button = QToolButton()
+        self.diagnostics_button.setText("診斷")
+        self.diagnostics_button.setCursor(Qt.PointingHandCursor)
+        self.diagnostics_button.setObjectName("diagnosticsButton")
+        self.diagnostics_button.setToolTip(metrics.format_summary())
+        self.diagnostics_button.clicked.connect(self.open_diagnostics)
+        self.status_bar.addPermanentWidget(self.diagnostics_button)
         
-        self.expansion_states = {}
-        self.dungeon_expansion_states = {}
+        self.expansion_states = ExpansionStateStore()
+        # (region, realm, name) -> 卡片元件與上次顯示的資料，用於差異更新與展開切換；
+        # 副本列登記在卡片的 "dungeons"，以 (region, realm, name, dungeon) 查詢
+        self.character_cards = {}
+        # (region, realm, name) -> 捲動區中代表該角色的元件（卡片、佔位卡片或錯誤訊息），排序與篩選時使用
+        self.roster_widgets = {}
+        # (region, realm, name) -> 佔位卡片的「載入中...」標籤；角色的卡片建立後移除，取消更新時由此標示未載入
+        self.placeholder_labels = {}
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_REFRESH_DELAY)
+        self.filter_timer.timeout.connect(self.apply_filters)
+        self.filter_fetcher = None  # 層數條件需要最佳紀錄時的補查工作
+
+        # 目前顯示的名單與各角色所在的列，背景自動更新的結果依此放回對應位置
+        self.characters = []
+        self.character_rows = {}
+        self.fetcher = None
+        # 展開時補查缺少資料層的工作 (region, realm, name) -> TierFetcher
+        self.tier_fetchers = {}
+        self.auto_refresh = AutoRefreshScheduler(
+            lambda: self.fetcher is not None and self.fetcher.isRunning(), tiers_for=self.tiers_for, parent=self)
+        self.auto_refresh.character_fetched.connect(self.display_refreshed_character)
         
         self.update_data()
+        startup_profiler.mark("建立主視窗")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            startup_profiler.mark("首次繪製")
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """首次繪製後才載入的資源：應用程式圖示、字型與本週詞綴"""
+        load_deferred_assets(self)
+        startup_profiler.mark("載入圖示與字型")
+        self.load_affixes()
+        startup_profiler.mark("載入詞綴快取")
+        startup_profiler.report()
 
     def center_window(self):
         # 獲取螢幕的可用幾何形狀
@@ -538,605 +1666,1010 @@ class RaiderIOMainWindow(QMainWindow):
         # 角色名單更新後，重新載入資料
         self.update_data()
 
-    def load_characters_from_file(self, filename="characters.txt"):
-        characters = []
-        filepath = get_characters_file_path()
-        if not os.path.exists(filepath):
-            # 如果檔案不存在，創建一個空的 characters.txt
-            try:
-                with open(filepath, "w", encoding="utf-8") as file:
-                    file.write("# 角色資料格式：地區,伺服器,角色名稱\n")
-            except Exception as e:
-                self.status_bar.showMessage(f"無法創建角色檔案: {str(e)}")
-                return []
-
+    def load_roster(self):
         try:
-            with open(filepath, "r", encoding="utf-8") as file:
-                for line in file:
-                    line = line.strip()
-                    if line and not line.startswith("#"):
-                        parts = line.split(",")
-                        if len(parts) == 3:
-                            region, realm, name = [p.strip() for p in parts]
-                            characters.append((region, realm, name))
+            return load_roster()
         except Exception as e:
-            self.status_bar.showMessage(f"無法讀取角色檔案: {str(e)}")
+            self.status_bar.showMessage(f"無法讀取角色名單: {str(e)}")
             return []
-        return characters
 
     def load_affixes(self):
-        """從 Raider.IO API 載入本週詞綴並顯示"""
-        try:
-            url = "https://raider.io/api/v1/mythic-plus/affixes?region=tw&locale=tw"
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-
-            # 清空現有的詞綴顯示
-            while self.affixes_layout.count():
-                item = self.affixes_layout.takeAt(0)
-                if item.widget():
-                    item.widget().deleteLater()
-
-            # 添加「本週詞綴」文字
-            affix_title_label = QLabel("本週詞綴")
-            affix_title_label.setFont(QFont("Noto Sans TC", 14, QFont.Bold))  # 與 Raider.IO 標誌字體一致
-            affix_title_label.setStyleSheet("color: #FF9A00;")  # 與 Raider.IO 標誌顏色一致
-            # 調整邊距，讓文字往上移動（增加底部邊距）
-            affix_title_label.setContentsMargins(0, 0, 0, 3)  # 左、上、右、下，增加 5 像素底部邊距
-            self.affixes_layout.addWidget(affix_title_label)    
-
-            # 顯示每個詞綴
-            for affix in data.get("affix_details", []):
-                icon_name = affix.get("icon", "")
-                name = affix.get("name", "未知詞綴")
-                description = affix.get("description", "無描述")
-
-                # 獲取詞綴縮圖
-                icon_url = f"https://render.worldofwarcraft.com/us/icons/56/{icon_name}.jpg"
-                try:
-                    with urllib.request.urlopen(icon_url) as response:
-                        img_data = response.read()
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(img_data)
-                    pixmap = pixmap.scaled(40, 40, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                except Exception as e:
-                    print(f"無法載入詞綴縮圖 {icon_name}: {str(e)}")
-                    pixmap = QPixmap()  # 空圖片作為備用
-
-                # 創建詞綴圖示標籤
-                affix_label = QLabel()
-                affix_label.setPixmap(pixmap)
-                affix_label.setFixedSize(40, 40)
-
-                # 設置工具提示，包含詞綴名稱和描述
-                tooltip_text = f"{name}\n{description}"
-                affix_label.setToolTip(tooltip_text)
-                affix_label.setStyleSheet("color: #FFFFFF; font: 12px 'Noto Sans TC';")
-
-                # 添加到佈局
-                self.affixes_layout.addWidget(affix_label)
-        except Exception as e:
-            print(f"無法載入本週詞綴: {str(e)}")
-            error_label = QLabel("無法載入詞綴")
-            error_label.setStyleSheet("color: #FF5555; font: 12px 'Noto Sans TC';")
-            self.affixes_layout.addWidget(error_label)
+        """先顯示快取中的本週詞綴，快取不是本週資料時才在背景向 Raider.IO 查詢"""
+        data, is_current = load_cached_affixes(AFFIX_REGION)
+        if data is not None:
+            self.display_affixes(data)
+        if is_current:
+            return
+
+        self.affix_fetcher = AffixFetcher(AFFIX_REGION)
+        self.affix_fetcher.affixes_fetched.connect(self.display_affixes)
+        self.affix_fetcher.fetch_failed.connect(lambda message, shown=data is not None: self.show_affix_error(message, shown))
+        self.affix_fetcher.start()
+
+    def display_affixes(self, data):
+        """顯示詞綴清單"""
+        # 清空現有的詞綴顯示
+        self.image_loader.cancel(self.affixes_frame)
+        while self.affixes_layout.count():
+            item = self.affixes_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+
+        # 添加「本週詞綴」文字
+        affix_title_label = QLabel("本週詞綴")
+        affix_title_label.setObjectName("affixTitle")  # 與 Raider.IO 標誌顏色一致
+        affix_title_label.setFont(get_font(14, True))  # 與 Raider.IO 標誌字體一致
+        # 調整邊距，讓文字往上移動（增加底部邊距）
+        affix_title_label.setContentsMargins(0, 0, 0, 3)  # 左、上、右、下，增加 5 像素底部邊距
+        self.affixes_layout.addWidget(affix_title_label)    
+
+        # 顯示每個詞綴
+        for affix in data.get("affix_details", []):
+            icon_name = affix.get("icon", "")
+            name = affix.get("name", "未知詞綴")
+            description = affix.get("description", "無描述")
+
+            # 創建詞綴圖示標籤，縮圖在背景載入完成後才換上
+            affix_label = QLabel()
+            affix_label.setFixedSize(40, 40)
+            icon_url = f"{AFFIX_ICON_BASE}/{icon_name}.jpg"
+            self.image_loader.load(icon_url, affix_label, self.affixes_frame, 40, fallback_text="")
+
+            # 設置工具提示，包含詞綴名稱和描述
+            tooltip_text = f"{name}\n{description}"
+            affix_label.setToolTip(tooltip_text)
+            affix_label.setObjectName("affixIcon")
+
+            # 添加到佈局
+            self.affixes_layout.addWidget(affix_label)
+
+    def show_affix_error(self, message, cached_shown):
+        print(f"無法載入本週詞綴: {message}")
+        if cached_shown:
+            return  # 保留上次的詞綴顯示
+        error_label = QLabel("無法載入詞綴")
+        error_label.setObjectName("affixError")
+        self.affixes_layout.addWidget(error_label)
+
+    def toggle_update(self):
+        """更新中按下按鈕時取消更新，否則開始更新"""
+        if self.fetcher is not None and self.fetcher.isRunning() and not self.fetcher.cancelled:
+            self.fetcher.cancel()
+            self.status_bar.showMessage("正在取消更新...")
+        else:
+            self.update_data()
+
+    def cancel_refresh(self):
+        """取消進行中的更新（包含背景自動更新），回傳已完成的結果供下一次更新沿用"""
+        reuse = self.auto_refresh.cancel()
+        for tier_job in self.tier_fetchers.values():
+            tier_job.cancel()  # 新的更新會依目前的展開狀態查詢需要的資料層
+        self.tier_fetchers.clear()
+        if self.filter_fetcher is not None:
+            self.filter_fetcher.cancel()
+            self.filter_fetcher = None
+        job = self.fetcher
+        self.fetcher = None  # 舊工作稍後送達的訊號不再是目前的工作，一律略過
+        if job is not None and job.isRunning():
+            job.cancel()
+            reuse.update(job.completed_results())
+        return reuse
 
     def update_data(self):
-        self.update_button.setEnabled(False)
+        # 新的更新取代進行中的更新：舊工作立即取消，已完成的角色直接沿用
+        reuse = self.cancel_refresh()
         self.update_button.setIcon(QIcon())  # 清除圖示
-        self.update_button.setText("更新中...")  # 顯示文字
+        self.update_button.setText("取消更新")  # 更新中按下按鈕可取消
         self.update_button.setFixedWidth(120)  # 調整寬度以適應文字
         self.status_bar.showMessage("正在更新角色資料...")
         
-        self.save_expansion_states()
-        
-        characters = self.load_characters_from_file()
+        characters = list(dict.fromkeys(self.load_roster()))  # 重複的角色只顯示一次
+        self.characters = characters
+        self.character_rows = {char_key: idx for idx, char_key in enumerate(characters)}
+        self.roster_index.set_characters(characters)
+        self.auto_refresh.set_characters(characters)
+        if self.roster_view is not None:
+            self.update_view_data(characters, reuse)
+            return
         if not characters:
             error_label = QLabel("未找到角色資料或檔案格式錯誤")
-            error_label.setStyleSheet("color: #FF5555; font: 12px 'Noto Sans TC'; padding: 20px;")
+            error_label.setObjectName("emptyRosterMessage")
             error_label.setAlignment(Qt.AlignCenter)
             self.clear_scroll_content()
             self.scroll_layout.addWidget(error_label)
-            self.update_button.setEnabled(True)
             self.update_button.setText("")
-            self.update_button.setIcon(QIcon(resource_path("refresh.ico")))  # 使用自訂圖示
+            self.update_button.setIcon(get_refresh_icon())  # 使用自訂圖示
             self.update_button.setFixedWidth(40)
             return
 
-        self.clear_scroll_content()
+        # 保留既有卡片，只為新角色放置佔位卡片；查詢完成後只更新有變動的部分
+        self.reconcile_cards(characters)
         
-        loading_label = QLabel("載入中...")
-        loading_label.setAlignment(Qt.AlignCenter)
-        loading_label.setStyleSheet("color: #999999; font: 14px 'Noto Sans TC'; padding: 20px;")
-        self.scroll_layout.addWidget(loading_label)
-        
-        self.fetcher = DataFetcher(characters)
-        self.fetcher.data_fetched.connect(self.display_data)
-        self.fetcher.finished.connect(self.update_finished)
-        self.fetcher.start()
+        self.start_refresh_job(characters, reuse, self.display_character, self.display_data)
+
+    def start_refresh_job(self, characters, reuse, on_character, on_results):
+        """啟動更新工作；工作被取消或取代後，尚未處理的結果訊號一律略過，不會覆蓋較新的資料"""
+        job = self.fetcher = DataFetcher(characters, reuse=reuse, tiers=[self.tiers_for(key) for key in characters])
+
+        def if_current(slot):
+            def call(*args):
+                if job is self.fetcher and not job.cancelled:
+                    slot(*args)
+            return call
+
+        if STREAM_RESULTS:
+            job.character_fetched.connect(if_current(on_character))
+            job.progress.connect(if_current(self.update_progress))
+        else:
+            job.data_fetched.connect(if_current(on_results))
+        job.finished.connect(lambda: job is self.fetcher and self.update_finished())
+        job.start()
+
+    def update_view_data(self, characters, reuse=None):
+        """QTreeView 顯示方式的更新流程"""
+        self.roster_model.set_placeholders(characters)
+        self.apply_filters()
+        if not characters:
+            self.status_bar.showMessage("未找到角色資料或檔案格式錯誤")
+            self.update_finished()
+            return
+
+        self.start_refresh_job(characters, reuse, self.display_view_character, self.display_view_results)
+
+    def display_view_character(self, idx, entry):
+        self.roster_model.update_character(idx, entry)
+        self.roster_index.update(entry[:3], entry[3])
+        self.schedule_filters()
+        self.ensure_tiers(entry[:3], entry[3])
+
+    def display_view_results(self, results):
+        self.roster_model.set_results(results)
+        for region, realm, name, profile in results:
+            self.roster_index.update((region, realm, name), profile)
+        self.apply_filters()
+
+    def toggle_view_row(self, index):
+        index = index.sibling(index.row(), 0)
+        if self.roster_model.hasChildren(index):
+            self.roster_view.setExpanded(index, not self.roster_view.isExpanded(index))
+
+    def record_view_expansion(self, index, expanded):
+        node = index.internalPointer()
+        if node.kind in (RosterNode.CHARACTER, RosterNode.DUNGEON):
+            self.expansion_states.set_expanded(node.key, expanded)
+            if expanded:
+                character = node if node.kind == RosterNode.CHARACTER else node.parent
+                self.ensure_tiers(character.key, character.info.get("profile"))
+
+    def restore_view_expansion(self, parent=QModelIndex(), first=None, last=None):
+        """列插入或重建後，依先前記錄的狀態展開角色與副本（預設展開前兩個角色）"""
+        if parent.isValid():
+            self.apply_view_expansion(parent)
+            return
+        for row in range(self.roster_model.rowCount()):
+            self.apply_view_expansion(self.roster_model.index(row, 0))
+
+    def apply_view_expansion(self, index):
+        model = self.roster_model
+        node = index.internalPointer()
+        if node.kind == RosterNode.CHARACTER:
+            expanded = self.expansion_states.is_expanded(node.key, self.character_rows.get(node.key, 2) < 2)
+        elif node.kind == RosterNode.DUNGEON:
+            expanded = self.expansion_states.is_expanded(node.key)
+        else:
+            expanded = False
+        if node.kind != RosterNode.DUNGEON:
+            self.roster_view.setFirstColumnSpanned(index.row(), index.parent(), True)
+        for row in range(model.rowCount(index)):
+            self.apply_view_expansion(model.index(row, 0, index))
+        if expanded and model.hasChildren(index):
+            self.roster_view.setExpanded(index, True)
+
+    def display_refreshed_character(self, entry):
+        """顯示背景自動更新的結果；角色已不在目前的名單中時略過"""
+        idx = self.character_rows.get(entry[:3])
+        if idx is None:
+            return
+        if self.roster_view is not None:
+            self.display_view_character(idx, entry)
+        else:
+            self.display_character(idx, entry)
+
+    def tiers_for(self, char_key):
+        """角色需要的資料層：收起的卡片只需摘要，展開後需要最佳紀錄，展開副本詳細紀錄後還需要最近紀錄；
+        目前資料已載入的層也一併查詢（由各層快取取得），更新時不會以較少的資料取代而丟棄已建立的副本列"""
+        tiers = ["summary"]
+        profile = self.roster_index.profile(char_key)
+        if profile is not None and profile.error is None:
+            tiers.extend(profile.tiers)
+        expanded = self.expansion_states.is_expanded(char_key, self.character_rows.get(char_key, 2) < 2)
+        if expanded or self.roster_filter.needs_best:
+            tiers.append("best")  # 層數篩選與排序也需要最佳紀錄
+        if expanded and self.expansion_states.has_expanded_children(char_key):
+            tiers.append("recent")
+        return normalize_tiers(tiers)
+
+    def ensure_tiers(self, char_key, profile):
+        """目前顯示的資料缺少需要的資料層時，在背景補查該角色；查詢中的相同請求不重複送出"""
+        if profile is None or profile.error is not None:
+            return
+        tiers = self.tiers_for(char_key)
+        if set(tiers) <= set(profile.tiers):
+            return
+        job = self.tier_fetchers.get(char_key)
+        if job is not None:
+            if set(tiers) <= set(job.tiers):
+                return
+            job.cancel()
+        # 以視窗為 parent，工作結束後才刪除，不會在執行中被回收
+        job = self.tier_fetchers[char_key] = TierFetcher(char_key, tiers, parent=self)
+        job.character_fetched.connect(lambda entry: self.display_tier_result(job, entry))
+        job.finished.connect(job.deleteLater)
+        job.start()
+
+    def display_tier_result(self, job, entry):
+        # 已被取消或取代的補查結果一律略過
+        if self.tier_fetchers.get(entry[:3]) is not job or job.cancelled:
+            return
+        del self.tier_fetchers[entry[:3]]
+        self.display_refreshed_character(entry)
+
+    def create_filter_bar(self):
+        """搜尋、篩選與排序列；條件改變時只調整卡片（或列）的可見性與順序（見 apply_filters）"""
+        filter_bar = QWidget()
+        filter_bar.setObjectName("filterBar")
+        filter_layout = QHBoxLayout(filter_bar)
+        filter_layout.setContentsMargins(0, 0, 0, 0)
+        filter_layout.setSpacing(8)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("搜尋名稱或伺服器")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self.update_filter)
+        filter_layout.addWidget(self.search_box, 1)
+
+        self.class_filter = QComboBox()
+        self.class_filter.addItem("所有職業", None)
+        for class_name in sorted(CLASS_COLORS):
+            self.class_filter.addItem(class_name, class_name)
+        self.class_filter.currentIndexChanged.connect(self.update_filter)
+        filter_layout.addWidget(self.class_filter)
+
+        filter_layout.addWidget(self.create_filter_label("分數"))
+        self.min_score_filter = self.create_filter_spin_box(5000, 100)
+        filter_layout.addWidget(self.min_score_filter)
+        filter_layout.addWidget(self.create_filter_label("–"))
+        self.max_score_filter = self.create_filter_spin_box(5000, 100)
+        filter_layout.addWidget(self.max_score_filter)
+
+        self.dungeon_filter = QComboBox()
+        self.dungeon_filter.addItem("所有副本", None)
+        for dungeon_name, display_name in DUNGEON_NAME_MAPPING.items():
+            self.dungeon_filter.addItem(display_name, dungeon_name)
+        self.dungeon_filter.currentIndexChanged.connect(self.update_filter)
+        filter_layout.addWidget(self.dungeon_filter)
+        filter_layout.addWidget(self.create_filter_label("層數 ≥"))
+        self.level_filter = self.create_filter_spin_box(40, 1)
+        filter_layout.addWidget(self.level_filter)
+
+        filter_layout.addWidget(self.create_filter_label("排序"))
+        self.sort_filter = QComboBox()
+        for sort in ROSTER_SORTS:
+            self.sort_filter.addItem(SORT_LABELS[sort], sort)
+        self.sort_filter.currentIndexChanged.connect(self.update_filter)
+        filter_layout.addWidget(self.sort_filter)
+
+        self.filter_count_label = self.create_filter_label("")
+        filter_layout.addWidget(self.filter_count_label)
+        return filter_bar
+
+    def create_filter_label(self, text):
+        label = QLabel(text)
+        label.setObjectName("filterLabel")
+        return label
+
+    def create_filter_spin_box(self, maximum, step):
+        spin_box = QSpinBox()
+        spin_box.setRange(0, maximum)
+        spin_box.setSingleStep(step)
+        spin_box.setSpecialValueText("不限")  # 0 表示不限
+        spin_box.valueChanged.connect(self.update_filter)
+        return spin_box
+
+    def update_filter(self, *_):
+        """由篩選列的目前內容建立條件並立即套用"""
+        previous = self.roster_filter
+        self.roster_filter = RosterFilter(
+            text=self.search_box.text(),
+            class_name=self.class_filter.currentData(),
+            min_score=self.min_score_filter.value() or None,
+            max_score=self.max_score_filter.value() or None,
+            dungeon=self.dungeon_filter.currentData(),
+            min_level=self.level_filter.value() or None,
+            sort=self.sort_filter.currentData(),
+        )
+        if self.roster_filter.needs_best and not previous.needs_best:
+            self.load_filter_tiers()
+        self.apply_filters()
+
+    def load_filter_tiers(self):
+        """層數篩選與排序需要最佳紀錄：一次補查名單中只載入摘要的角色，結果以背景自動更新的方式顯示"""
+        missing = []
+        for char_key in self.characters:
+            profile = self.roster_index.profile(char_key)
+            if profile is not None and profile.error is None and "best" not in profile.tiers:
+                missing.append(char_key)
+        if self.filter_fetcher is not None:
+            self.filter_fetcher.cancel()
+            self.filter_fetcher = None
+        if not missing:
+            return
+        job = self.filter_fetcher = DataFetcher(missing, tiers=[self.tiers_for(key) for key in missing])
+        job.character_fetched.connect(
+            lambda idx, entry: job is self.filter_fetcher and not job.cancelled and self.display_refreshed_character(entry))
+        job.start()
+
+    def schedule_filters(self):
+        """角色資料變動後稍後重新套用篩選與排序；沒有任何條件時名單順序不會改變，不需套用"""
+        criteria = self.roster_filter
+        if (criteria.active or criteria.sort != "roster") and not self.filter_timer.isActive():
+            self.filter_timer.start()
+
+    def filter_matches(self, char_key):
+        return not self.roster_filter.active or char_key in self.roster_index.matches(self.roster_filter, [char_key])
+
+    @timed("render", "apply_filters")
+    def apply_filters(self):
+        """依搜尋、篩選與排序條件調整名單：只改變卡片（或列）的可見性與順序，不重建任何元件"""
+        self.filter_timer.stop()
+        criteria = self.roster_filter
+        order = self.roster_index.order(criteria.sort, criteria.dungeon)
+        matched = self.roster_index.matches(criteria) if criteria.active else set(order)
+        if self.roster_view is not None:
+            self.roster_model.set_order(order)
+            for row, node in enumerate(self.roster_model.root.children):
+                hidden = node.key not in matched
+                if self.roster_view.isRowHidden(row, QModelIndex()) != hidden:
+                    self.roster_view.setRowHidden(row, QModelIndex(), hidden)
+        else:
+            self.arrange_cards(order)
+            for char_key, widget in self.roster_widgets.items():
+                hidden = char_key not in matched
+                if widget.isHidden() != hidden:
+                    widget.setHidden(hidden)
+        self.filter_count_label.setText(f"{len(matched)} / {len(order)}" if criteria.active else "")
+
+    def closeEvent(self, event):
+        # 關閉視窗時停止所有查詢，背景執行緒不會在結束後繼續送出請求
+        self.cancel_refresh()
+        super().closeEvent(event)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            # 最小化時暫停背景自動更新，還原後從逾期最久的角色繼續
+            if self.isMinimized():
+                self.auto_refresh.pause()
+            else:
+                self.auto_refresh.resume()
+
+    def update_progress(self, completed, total):
+        self.status_bar.showMessage(f"正在更新角色資料... ({completed}/{total})")
 
     def update_finished(self):
-        self.update_button.setEnabled(True)
         self.update_button.setText("")
-        self.update_button.setIcon(QIcon(resource_path("refresh.ico")))  # 使用自訂圖示
+        self.update_button.setIcon(get_refresh_icon())  # 使用自訂圖示
         self.update_button.setFixedWidth(40)
-        self.status_bar.showMessage("資料更新完成", 3000)
+        if self.fetcher is not None and self.fetcher.cancelled:
+            self.show_fetched(self.fetcher)
+            skipped = self.mark_unloaded()
+            self.status_bar.showMessage(f"已取消更新，{skipped} 名角色未載入" if skipped else "已取消更新", 5000)
+        else:
+            self.status_bar.showMessage("資料更新完成", 3000)
+        self.diagnostics_button.setToolTip(metrics.format_summary())
+
+    def show_fetched(self, job):
+        """更新取消後，已查詢完成但訊號被略過的角色仍替換其佔位卡片"""
+        for idx, entry in enumerate(list(job.results)):
+            if entry is None:
+                continue
+            if self.roster_view is not None:
+                node = self.roster_model.nodes.get(entry[:3])
+                if node is not None and "profile" not in node.info:
+                    self.display_view_character(idx, entry)
+            elif entry[:3] not in self.character_cards:
+                self.display_character(idx, entry)
+
+    def mark_unloaded(self):
+        """更新取消後，把仍顯示「載入中...」的佔位卡片改為未載入，回傳其數量；下次更新時會重新放置佔位卡片"""
+        if self.roster_view is not None:
+            return self.roster_model.mark_unloaded()
+        for loading_label in self.placeholder_labels.values():
+            loading_label.setText("未載入")
+        return len(self.placeholder_labels)
+
+    def open_diagnostics(self):
+        DiagnosticsDialog(self).exec_()
+        self.diagnostics_button.setToolTip(metrics.format_summary())
 
     def clear_scroll_content(self):
+        self.character_cards.clear()
+        self.roster_widgets.clear()
+        self.placeholder_labels.clear()
         while self.scroll_layout.count():
             child = self.scroll_layout.takeAt(0)
             if child.widget():
+                self.image_loader.cancel(child.widget())
                 child.widget().deleteLater()
 
-    def save_expansion_states(self):
-        self.expansion_states = {}
-        self.dungeon_expansion_states = {}
-        
-        for i in range(self.scroll_layout.count()):
-            widget = self.scroll_layout.itemAt(i).widget()
-            if widget and hasattr(widget, 'objectName') and widget.objectName().startswith('charCard_'):
-                char_id = widget.objectName().split('_')[1]
-                content_frame = widget.findChild(QFrame, f'contentFrame_{char_id}')
-                if content_frame:
-                    self.expansion_states[char_id] = content_frame.isVisible()
-                    
-                    for dungeon_widget in content_frame.findChildren(QWidget, "^dungeonContent_.*"):
-                        dungeon_id = dungeon_widget.objectName().split('_')[1]
-                        detail_frame = dungeon_widget.findChild(QFrame, f'detailFrame_{dungeon_id}')
-                        if detail_frame:
-                            self.dungeon_expansion_states[dungeon_id] = detail_frame.isVisible()
-
     def get_score_color(self, score):
-        if score >= 2000:
-            return "#E16AFF"
-        elif score >= 1500:
-            return "#4C97FC"
-        elif score >= 1000:
-            return "#1CE2B2"
-        elif score >= 500:
-            return "#67FD0A"
-        else:
-            return "#FFFFFF"
+        return TIER_COLORS[get_tier(score, SCORE_TIERS)]
+
+    def get_dungeon_row(self, dungeon_key):
+        """以 (region, realm, name, dungeon) 取得已建立的副本列"""
+        card = self.character_cards.get(dungeon_key[:3])
+        return card["dungeons"].get(dungeon_key[3]) if card else None
 
-    def toggle_content(self, char_id):
-        sender = self.sender()
-        content_frame = self.findChild(QFrame, f'contentFrame_{char_id}')
+    def toggle_content(self, char_key):
+        card = self.character_cards.get(char_key)
         
-        if content_frame:
+        if card:
+            content_frame = card["content_frame"]
             is_visible = content_frame.isVisible()
+            if not is_visible and not card["content_built"]:
+                # 第一次展開時才建立副本資訊
+                self.populate_card_content(card, card["profile"])
             content_frame.setVisible(not is_visible)
+            self.expansion_states.set_expanded(char_key, not is_visible)
+            if not is_visible:
+                self.ensure_tiers(char_key, card["profile"])
             
+            toggle_button = card["toggle_button"]
             if is_visible:
-                sender.setText("▼")
-                sender.setToolTip("展開副本資訊")
+                toggle_button.setText("▼")
+                toggle_button.setToolTip("展開副本資訊")
             else:
-                sender.setText("▲")
-                sender.setToolTip("收起副本資訊")
+                toggle_button.setText("▲")
+                toggle_button.setToolTip("收起副本資訊")
 
-    def toggle_dungeon_detail(self, dungeon_id):
-        sender = self.sender()
-        detail_frame = self.findChild(QFrame, f'detailFrame_{dungeon_id}')
+    def toggle_dungeon_detail(self, dungeon_key):
+        row = self.get_dungeon_row(dungeon_key)
         
-        if detail_frame:
+        if row:
+            if row["detail_frame"] is None:
+                # 第一次展開時才建立最近紀錄
+                self.build_detail_frame(row)
+            detail_frame = row["detail_frame"]
             is_visible = detail_frame.isVisible()
             detail_frame.setVisible(not is_visible)
+            self.expansion_states.set_expanded(dungeon_key, not is_visible)
+            if not is_visible:
+                self.ensure_tiers(dungeon_key[:3], self.character_cards[dungeon_key[:3]]["profile"])
             
+            detail_toggle = row["detail_toggle"]
             if is_visible:
-                sender.setText("▼")
-                sender.setToolTip("展開詳細紀錄")
+                detail_toggle.setText("▼")
+                detail_toggle.setToolTip("展開詳細紀錄")
             else:
-                sender.setText("▲")
-                sender.setToolTip("收起詳細紀錄")
+                detail_toggle.setText("▲")
+                detail_toggle.setToolTip("收起詳細紀錄")
 
+    @timed("render", "display_data")
     def display_data(self, results):
         try:
+            self.reconcile_cards([(region, realm, name) for region, realm, name, _ in results])
+            for idx, entry in enumerate(results):
+                self.display_character(idx, entry)
+        except Exception as e:
+            import traceback  # 只在發生錯誤時才需要
+            error_message = f"發生錯誤: {str(e)}\n{traceback.format_exc()}"
+            error_label = QLabel(error_message)
+            error_label.setObjectName("errorMessage")
+            error_label.setFont(get_font())
             self.clear_scroll_content()
+            self.scroll_layout.addWidget(error_label)
+            self.status_bar.showMessage("顯示資料時發生錯誤", 5000)
+
+    @timed("render", "reconcile_cards")
+    def reconcile_cards(self, characters):
+        """依角色名單調整卡片：保留既有卡片、為新角色放置佔位卡片、移除已不在名單中的卡片，
+        再依目前的篩選與排序條件排列"""
+        wanted_keys = set(characters)
+        widgets = {}
+        self.placeholder_labels = {}  # 佔位卡片每次重新建立，舊的隨其元件一併移除
+        for region, realm, name in characters:
+            card = self.character_cards.get((region, realm, name))
+            widgets[(region, realm, name)] = card["widget"] if card else self.create_placeholder_card(region, realm, name)
+        for char_key in list(self.character_cards):
+            if char_key not in wanted_keys:
+                del self.character_cards[char_key]
+
+        keep = set(widgets.values())
+        for i in reversed(range(self.scroll_layout.count())):
+            widget = self.scroll_layout.itemAt(i).widget()
+            if widget is not None and widget not in keep:
+                self.scroll_layout.takeAt(i)
+                self.image_loader.cancel(widget)
+                widget.deleteLater()
+        self.roster_widgets = widgets
+        self.apply_filters()
+
+    def arrange_cards(self, order):
+        """依 order 排列捲動區中的元件（最後為 stretch），排列沒有變動時不做任何事"""
+        wanted_widgets = [self.roster_widgets[char_key] for char_key in order if char_key in self.roster_widgets]
+        if len(wanted_widgets) != len(self.roster_widgets):
+            ordered = set(order)
+            wanted_widgets += [widget for char_key, widget in self.roster_widgets.items() if char_key not in ordered]
+        current_widgets = [self.scroll_layout.itemAt(i).widget() for i in range(self.scroll_layout.count())]
+        if current_widgets == wanted_widgets + [None]:
+            return
+        while self.scroll_layout.count():
+            self.scroll_layout.takeAt(0)
+        for widget in wanted_widgets:
+            self.scroll_layout.addWidget(widget)
+        self.scroll_layout.addStretch()
+
+    def display_character(self, idx, entry):
+        """顯示查詢完成的角色：資料未變動時略過，已有卡片時只更新差異，否則替換佔位卡片"""
+        region, realm, name, profile = entry
+        char_key = (region, realm, name)
+        card = self.character_cards.get(char_key)
+        if card is not None and card["profile"] == profile:
+            return
+        self.roster_index.update(char_key, profile)
+        self.schedule_filters()
+        try:
+            # 每張卡片的建立與更新時間分別記錄
+            if card is not None:
+                with metrics.timer("render", "update_card", character=f"{region}/{realm}/{name}"):
+                    self.update_character_card(card, profile)
+                self.ensure_tiers(char_key, profile)
+                return
+            with metrics.timer("render", "create_card", character=f"{region}/{realm}/{name}"):
+                new_widget = self.create_character_card(idx, region, realm, name, profile)
+            self.ensure_tiers(char_key, profile)
+        except Exception as e:
+            import traceback  # 只在發生錯誤時才需要
+            self.character_cards.pop(char_key, None)
+            new_widget = QLabel(f"發生錯誤: {str(e)}\n{traceback.format_exc()}")
+            new_widget.setObjectName("errorMessage")
+            new_widget.setFont(get_font())
+            self.status_bar.showMessage("顯示資料時發生錯誤", 5000)
+
+        # 取代該角色目前的元件（名單可能已依排序移動，以角色尋找位置）
+        old_widget = self.roster_widgets.get(char_key)
+        position = self.scroll_layout.indexOf(old_widget) if old_widget is not None else -1
+        self.scroll_layout.insertWidget(position if position >= 0 else idx, new_widget)
+        self.roster_widgets[char_key] = new_widget
+        self.placeholder_labels.pop(char_key, None)
+        new_widget.setHidden(not self.filter_matches(char_key))
+        if old_widget is not None:
+            self.image_loader.cancel(old_widget)
+            self.scroll_layout.removeWidget(old_widget)
+            old_widget.deleteLater()
+
+    def create_placeholder_card(self, region, realm, name):
+        """建立查詢中角色的佔位卡片"""
+        placeholder = QFrame()
+        placeholder.setObjectName("cardPlaceholder")
+        placeholder_layout = QHBoxLayout(placeholder)
+        placeholder_layout.setContentsMargins(15, 15, 15, 15)
+
+        title_label = QLabel(name)
+        title_label.setFont(get_font(14, True))
+        placeholder_layout.addWidget(title_label)
+
+        realm_label = QLabel(f"{region}-{realm}")
+        realm_label.setObjectName("realmLabel")
+        realm_label.setFont(get_font(12))
+        placeholder_layout.addWidget(realm_label)
+
+        placeholder_layout.addStretch()
+
+        loading_label = QLabel("載入中...")
+        loading_label.setObjectName("loadingLabel")
+        placeholder_layout.addWidget(loading_label)
+        self.placeholder_labels[(region, realm, name)] = loading_label
+        return placeholder
+
+    def create_character_card(self, idx, region, realm, name, profile):
+        """建立單一角色的卡片（標題列與副本資訊），並登記可局部更新的元件"""
+        char_key = (region, realm, name)
+        
+        char_widget = QWidget()
+        char_layout = QVBoxLayout(char_widget)
+        char_layout.setContentsMargins(0, 0, 0, 0)
+        char_layout.setSpacing(0)
+        
+        header_frame = QFrame()
+        header_frame.setObjectName("cardHeader")
+        header_layout = QVBoxLayout(header_frame)
+        header_layout.setContentsMargins(15, 15, 15, 15)
+        
+        char_header = QHBoxLayout()
+        
+        thumbnail_label = QLabel()
+        thumbnail_label.setMinimumSize(40, 40)
+        thumbnail_label.setObjectName("thumbnailLabel")
+        char_header.addWidget(thumbnail_label)
+        
+        toggle_button = QToolButton()
+        is_expanded = self.expansion_states.is_expanded(char_key, idx < 2)
+        toggle_button.setObjectName("cardToggle")
+        toggle_button.setText("▲" if is_expanded else "▼")
+        toggle_button.setToolTip(f'<span style="color: #FFFFFF;">{"收起副本資訊" if is_expanded else "展開副本資訊"}</span>')
+        toggle_button.clicked.connect(lambda checked, key=char_key: self.toggle_content(key))
+        char_header.addWidget(toggle_button)
+        
+        title_label = QLabel(name)
+        title_label.setObjectName("characterName")
+        title_label.setFont(get_font(14, True))
+        char_header.addWidget(title_label)
+        
+        realm_label = QLabel(f"{region}-{realm}")
+        realm_label.setObjectName("realmLabel")
+        realm_label.setFont(get_font(12))
+        char_header.addWidget(realm_label)
+        
+        char_header.addStretch()
+        
+        score_label = QLabel()
+        score_label.setObjectName("scoreBadge")
+        char_header.addWidget(score_label)
+        
+        header_layout.addLayout(char_header)
+        
+        char_layout.addWidget(header_frame)
+        
+        content_frame = QFrame()
+        content_frame.setObjectName("cardContent")
+        content_frame.setVisible(is_expanded)
+        
+        content_layout = QVBoxLayout(content_frame)
+        content_layout.setContentsMargins(10, 10, 10, 10)
+        
+        char_layout.addWidget(content_frame)
+
+        card = {
+            "key": char_key,
+            "widget": char_widget,
+            "toggle_button": toggle_button,
+            "profile": profile,
+            "thumbnail_label": thumbnail_label,
+            "title_label": title_label,
+            "score_label": score_label,
+            "content_frame": content_frame,
+            "content_layout": content_layout,
+            "content_built": False,
+            "dungeons": {},
+        }
+        self.set_card_thumbnail(card, profile.thumbnail_url)
+        self.set_card_class(card, profile.class_name)
+        self.set_card_score(card, profile.score)
+        if is_expanded:
+            # 收起的卡片等到第一次展開時才建立副本資訊
+            self.populate_card_content(card, profile)
+        self.character_cards[char_key] = card
+        return char_widget
+
+    def update_character_card(self, card, profile):
+        """只更新與上次資料不同的標題欄位與副本列"""
+        old_profile = card["profile"]
+        card["profile"] = profile
+        if profile.thumbnail_url != old_profile.thumbnail_url:
+            self.set_card_thumbnail(card, profile.thumbnail_url)
+        if profile.class_name != old_profile.class_name:
+            self.set_card_class(card, profile.class_name)
+        if profile.score != old_profile.score:
+            self.set_card_score(card, profile.score)
+        if not card["content_built"]:
+            return  # 副本資訊尚未建立，展開時會以最新資料建立
+
+        if profile.error is not None or old_profile.error is not None:
+            if profile.error != old_profile.error:
+                self.populate_card_content(card, profile)
+            return
+        if (("best" in profile.tiers) != ("best" in old_profile.tiers)
+                or list(profile.dungeons) != list(card["dungeons"])):
+            self.populate_card_content(card, profile)
+            return
+        for dungeon_name, summary in profile.dungeons.items():
+            row = card["dungeons"][dungeon_name]
+            if summary.best_run != row["best_run"]:
+                self.set_dungeon_row(row, summary.best_run)
+            recent_runs = summary.recent_runs if "recent" in profile.tiers else None
+            if recent_runs != row["recent_runs"]:
+                self.set_recent_runs(row, recent_runs)
+
+    def set_card_thumbnail(self, card, thumbnail_url):
+        thumbnail_label = card["thumbnail_label"]
+        self.image_loader.cancel(card["widget"])
+        if thumbnail_url:
+            # 先以空白佔位，縮圖在背景載入完成後才換上
+            thumbnail_label.clear()
+            self.image_loader.load(thumbnail_url, thumbnail_label, card["widget"], 40)
+        else:
+            thumbnail_label.setText("無縮圖")
+
+    def set_card_class(self, card, class_name):
+        # 套用職業顏色（樣式表中的 playerClass 規則）
+        set_style_property(card["title_label"], "playerClass", class_property(class_name))
+
+    def set_card_score(self, card, overall_score):
+        score_label = card["score_label"]
+        if overall_score is not None:
+            score_label.setText(f"{overall_score:.1f}")
+            score_label.setFont(get_font(16, True))
+            set_style_property(score_label, "tier", get_tier(overall_score, SCORE_TIERS))
+        else:
+            score_label.setText("N/A")
+            score_label.setFont(QApplication.font())
+            set_style_property(score_label, "tier", "missing")
+
+    @timed("render", "card_content")
+    def populate_card_content(self, card, profile):
+        """（重新）建立卡片的副本資訊區塊"""
+        content_layout = card["content_layout"]
+        while content_layout.count():
+            child = content_layout.takeAt(0)
+            if child.widget():
+                child.widget().deleteLater()
+        card["dungeons"] = {}
+        card["content_built"] = True
+
+        dungeon_header = QWidget()
+        dungeon_header_layout = QHBoxLayout(dungeon_header)
+        dungeon_header_layout.setContentsMargins(5, 8, 5, 8)
+        dungeon_header_layout.setSpacing(0)
+        
+        header_labels = ["副本", "層數", "分數", "鑰石", "通關時間", "完成日期"]
+        header_widths = [200, 40, 40, 40, 60, 120]  # 固定每個欄位的寬度
+        header_margins = [0, 2, 2, 2, 2, 2]  # 對應每個欄位的左邊距：副本 | 層數 | 分數 | 鑰石 | 通關時間 | 完成日期
+        for i, (label, width, margin) in enumerate(zip(header_labels, header_widths, header_margins)):
+            header_label = QLabel(label)
+            header_label.setObjectName("columnHeader")
+            header_label.setFont(get_font(10, True))
+            if i == 0:
+                header_label.setAlignment(Qt.AlignLeft)
+            else:
+                header_label.setAlignment(Qt.AlignCenter)
+            header_label.setMinimumWidth(width)
+            header_label.setMaximumWidth(width)
+            header_label.setContentsMargins(margin, 0, 0, 0)
+            dungeon_header_layout.addWidget(header_label)
+        
+        content_layout.addWidget(dungeon_header)
+        
+        if profile.error is not None:
+            error_widget = QWidget()
+            error_layout = QHBoxLayout(error_widget)
+            error_layout.setContentsMargins(5, 10, 5, 10)
             
-            for idx, (region, realm, name, data) in enumerate(results):
-                char_id = f"{region}_{realm}_{name}"
-                
-                char_widget = QWidget()
-                char_widget.setObjectName(f"charCard_{char_id}")
-                char_layout = QVBoxLayout(char_widget)
-                char_layout.setContentsMargins(0, 0, 0, 0)
-                char_layout.setSpacing(0)
-                
-                header_frame = QFrame()
-                header_frame.setStyleSheet("background-color: #252C38; border-radius: 6px;")
-                header_layout = QVBoxLayout(header_frame)
-                header_layout.setContentsMargins(15, 15, 15, 15)
-                
-                char_header = QHBoxLayout()
-                
-                thumbnail_url = data.get("thumbnail_url", "")
-                if thumbnail_url:
-                    try:
-                        with urllib.request.urlopen(thumbnail_url) as response:
-                            img_data = response.read()
-                        pixmap = QPixmap()
-                        pixmap.loadFromData(img_data)
-                        pixmap = pixmap.scaled(40, 40, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        thumbnail_label = QLabel()
-                        thumbnail_label.setPixmap(pixmap)
-                        char_header.addWidget(thumbnail_label)
-                    except Exception as e:
-                        thumbnail_label = QLabel("無縮圖")
-                        thumbnail_label.setStyleSheet("color: #999999; font: 12px 'Noto Sans TC';")
-                        char_header.addWidget(thumbnail_label)
-                else:
-                    thumbnail_label = QLabel("無縮圖")
-                    thumbnail_label.setStyleSheet("color: #999999; font: 12px 'Noto Sans TC';")
-                    char_header.addWidget(thumbnail_label)
-                
-                toggle_button = QToolButton()
-                is_expanded = self.expansion_states.get(char_id, idx < 2)
-                toggle_button.setText("▲" if is_expanded else "▼")
-                toggle_button.setStyleSheet("""
-                    QToolButton {
-                        background-color: transparent;
-                        color: #999999;
-                        border: none;
-                        font-size: 14px;
-                        font-weight: bold;
-                    }
-                    QToolButton:hover {
-                        color: #FFFFFF;
-                    }
-                """)
-                toggle_button.setToolTip(f'<span style="color: #FFFFFF;">{"收起副本資訊" if is_expanded else "展開副本資訊"}</span>')
-                toggle_button.setObjectName(f"toggleBtn_{char_id}")
-                toggle_button.clicked.connect(lambda checked, cid=char_id: self.toggle_content(cid))
-                char_header.addWidget(toggle_button)
-                
-                # 套用職業顏色
-                class_name = data.get("class", "Unknown")
-                class_color = CLASS_COLORS.get(class_name, "#FFFFFF")
-                title_label = QLabel(name)
-                title_label.setFont(QFont("Noto Sans TC", 14, QFont.Bold))
-                title_label.setStyleSheet(f"color: {class_color};")
-                char_header.addWidget(title_label)
-                
-                realm_label = QLabel(f"{region}-{realm}")
-                realm_label.setStyleSheet("color: #999999;")
-                realm_label.setFont(QFont("Noto Sans TC", 12))
-                char_header.addWidget(realm_label)
-                
-                char_header.addStretch()
-                
-                mythic_plus_scores = data.get("mythic_plus_scores_by_season", [])
-                overall_score = mythic_plus_scores[0]["scores"]["all"] if mythic_plus_scores else "N/A"
-                
-                if isinstance(overall_score, (int, float)):
-                    score_color = self.get_score_color(overall_score)
-                    score_label = QLabel(f"{overall_score:.1f}")
-                    score_label.setFont(QFont("Noto Sans TC", 16, QFont.Bold))
-                    score_label.setStyleSheet(f"color: {score_color}; background-color: #1D2128; padding: 5px 10px; border-radius: 4px;")
-                    char_header.addWidget(score_label)
-                else:
-                    score_label = QLabel("N/A")
-                    score_label.setStyleSheet("color: #999999;")
-                    char_header.addWidget(score_label)
-                
-                header_layout.addLayout(char_header)
+            error_label = QLabel("錯誤: " + profile.error)
+            error_label.setObjectName("contentError")
+            error_label.setFont(get_font())
+            error_layout.addWidget(error_label)
+            
+            content_layout.addWidget(error_widget)
+            return
+
+        if "best" not in profile.tiers:
+            # 最佳紀錄在卡片展開時才查詢，完成後重新建立
+            loading_label = QLabel("載入中...")
+            loading_label.setObjectName("loadingLabel")
+            loading_label.setAlignment(Qt.AlignCenter)
+            content_layout.addWidget(loading_label)
+            return
+
+        if not profile.dungeons:
+            no_record = QLabel("無紀錄")
+            no_record.setObjectName("noRecord")
+            no_record.setFont(get_font())
+            no_record.setAlignment(Qt.AlignCenter)
+            content_layout.addWidget(no_record)
+            return
+
+        dungeon_names = list(profile.dungeons)
+        for dungeon_name, summary in profile.dungeons.items():
+            row = self.create_dungeon_row(card["key"] + (dungeon_name,), summary.display_name)
+            self.set_dungeon_row(row, summary.best_run)
+            self.set_recent_runs(row, summary.recent_runs if "recent" in profile.tiers else None)
+            if self.expansion_states.is_expanded(row["key"]):
+                self.build_detail_frame(row)
+            card["dungeons"][dungeon_name] = row
+            content_layout.addWidget(row["container"])
+            
+            if dungeon_name != dungeon_names[-1]:
+                separator = QFrame()
+                separator.setFrameShape(QFrame.HLine)
+                separator.setFrameShadow(QFrame.Sunken)
+                separator.setObjectName("rowSeparator")
+                content_layout.addWidget(separator)
+
+    def create_dungeon_row(self, dungeon_key, display_dungeon_name):
+        """建立副本列，欄位內容由 set_dungeon_row 填入；最近紀錄區塊由 build_detail_frame 在展開時建立"""
+        
+        dungeon_container = QWidget()
+        dungeon_container_layout = QVBoxLayout(dungeon_container)
+        dungeon_container_layout.setContentsMargins(0, 0, 0, 0)
+        dungeon_container_layout.setSpacing(0)
+        
+        run_widget = QWidget()
+        run_widget.setObjectName("dungeonRow")
+        run_layout = QHBoxLayout(run_widget)
+        run_layout.setContentsMargins(5, 8, 5, 8)
+        run_layout.setSpacing(0)
+        
+        detail_toggle = QToolButton()
+        is_detail_expanded = self.expansion_states.is_expanded(dungeon_key)
+        detail_toggle.setObjectName("detailToggle")
+        detail_toggle.setText("▲" if is_detail_expanded else "▼")
+        detail_toggle.setToolTip(f'<span style="color: #FFFFFF;">{"收起詳細紀錄" if is_detail_expanded else "展開詳細紀錄"}</span>')
+        detail_toggle.clicked.connect(lambda checked, key=dungeon_key: self.toggle_dungeon_detail(key))
+        detail_toggle.setMinimumWidth(20)
+        detail_toggle.setMaximumWidth(20)
+        run_layout.addWidget(detail_toggle)
+        
+        name_label = QLabel(display_dungeon_name)
+        name_label.setFont(get_font(10, True))
+        name_label.setMinimumWidth(180)
+        name_label.setMaximumWidth(180)
+        run_layout.addWidget(name_label)
+        
+        row = {
+            "key": dungeon_key,
+            "container": dungeon_container,
+            "detail_toggle": detail_toggle,
+            "container_layout": dungeon_container_layout,
+            "detail_frame": None,
+            "detail_layout": None,
+            "best_run": None,
+            "recent_runs": None,
+        }
+        for key, width, bold in (("level_label", 40, True), ("score_label", 40, True), ("keystone_label", 40, True),
+                                 ("time_label", 60, False), ("date_label", 120, False)):
+            label = QLabel()
+            label.setFont(get_font(10, bold))
+            label.setAlignment(Qt.AlignCenter)
+            label.setMinimumWidth(width)
+            label.setMaximumWidth(width)
+            run_layout.addWidget(label)
+            row[key] = label
+        
+        dungeon_container_layout.addWidget(run_widget)
+        return row
+
+    @timed("render", "detail_frame")
+    def build_detail_frame(self, row):
+        """建立副本的最近紀錄區塊並填入目前的最近紀錄"""
+        detail_frame = QFrame()
+        detail_frame.setObjectName("recentRuns")
+        
+        detail_layout = QVBoxLayout(detail_frame)
+        detail_layout.setContentsMargins(5, 5, 5, 5)
+        detail_layout.setSpacing(2)
+        
+        detail_title = QLabel("最近紀錄")
+        detail_title.setObjectName("recentTitle")
+        detail_title.setFont(get_font())
+        detail_layout.addWidget(detail_title)
+        
+        row["container_layout"].addWidget(detail_frame)
+        row["detail_frame"] = detail_frame
+        row["detail_layout"] = detail_layout
+        self.set_recent_runs(row, row["recent_runs"])
+
+    def set_dungeon_row(self, row, best_run):
+        """填入（或更新）副本列的最佳紀錄欄位"""
+        row["best_run"] = best_run
+        level = best_run.mythic_level
+        row["level_label"].setText(str(level))
+        set_style_property(row["level_label"], "tier", get_tier(level, LEVEL_TIERS))
+        
+        dungeon_score = best_run.score
+        row["score_label"].setText(f"{dungeon_score:.1f}" if dungeon_score is not None else "N/A")
+        set_style_property(row["score_label"], "tier",
+                           get_tier(dungeon_score, SCORE_TIERS) if dungeon_score is not None else "none")
+        
+        keystone_upgrades = best_run.keystone_upgrades
+        row["keystone_label"].setText(f"✓ +{keystone_upgrades}" if keystone_upgrades > 0 else "✗ 超時")
+        set_style_property(row["keystone_label"], "keystone", "timed" if keystone_upgrades > 0 else "depleted")
+        
+        row["time_label"].setText(best_run.time_text)
+        row["date_label"].setText(best_run.date_text)
+
+    def set_recent_runs(self, row, dungeon_recent_runs):
+        """（重新）建立副本的最近紀錄列，保留最上方的「最近紀錄」標題；None 表示最近紀錄尚未載入"""
+        row["recent_runs"] = dungeon_recent_runs
+        detail_layout = row["detail_layout"]
+        if detail_layout is None:
+            return  # 最近紀錄區塊尚未建立，展開時會以最新資料建立
+        while detail_layout.count() > 1:
+            child = detail_layout.takeAt(1)
+            if child.widget():
+                child.widget().deleteLater()
+        
+        if dungeon_recent_runs is None:
+            loading_label = QLabel("載入中...")
+            loading_label.setObjectName("loadingLabel")
+            loading_label.setAlignment(Qt.AlignCenter)
+            detail_layout.addWidget(loading_label)
+        elif dungeon_recent_runs:
+            for recent_run in dungeon_recent_runs:
+                recent_widget = QWidget()
+                recent_layout = QHBoxLayout(recent_widget)
+                recent_layout.setContentsMargins(5, 8, 5, 8)
+                recent_layout.setSpacing(0)
                 
-                char_layout.addWidget(header_frame)
+                # 空白佔位符，對應父節點的展開按鈕
+                spacer_label = QLabel("")
+                spacer_label.setMinimumWidth(20)
+                spacer_label.setMaximumWidth(20)
+                recent_layout.addWidget(spacer_label)
                 
-                content_frame = QFrame()
-                content_frame.setObjectName(f"contentFrame_{char_id}")
-                content_frame.setStyleSheet("background-color: #1D2128; border-radius: 6px; margin-top: 2px;")
-                content_frame.setVisible(is_expanded)
+                # 空白佔位符，對應父節點的副本名稱欄
+                spacer_label2 = QLabel("")
+                spacer_label2.setMinimumWidth(180)
+                spacer_label2.setMaximumWidth(180)
+                recent_layout.addWidget(spacer_label2)
                 
-                content_layout = QVBoxLayout(content_frame)
-                content_layout.setContentsMargins(10, 10, 10, 10)
+                # 層數欄，對應父節點的層數欄
+                level_label = QLabel(str(recent_run.mythic_level))
+                level_label.setProperty("tier", get_tier(recent_run.mythic_level, LEVEL_TIERS))
+                level_label.setFont(get_font(10, True))
+                level_label.setAlignment(Qt.AlignCenter)
+                level_label.setMinimumWidth(40)
+                level_label.setMaximumWidth(40)
+                recent_layout.addWidget(level_label)
                 
-                dungeon_header = QWidget()
-                dungeon_header_layout = QHBoxLayout(dungeon_header)
-                dungeon_header_layout.setContentsMargins(5, 8, 5, 8)
-                dungeon_header_layout.setSpacing(0)
+                # 空白佔位符，對應父節點的分數欄
+                spacer_label3 = QLabel("")
+                spacer_label3.setMinimumWidth(40)
+                spacer_label3.setMaximumWidth(40)
+                recent_layout.addWidget(spacer_label3)
                 
-                header_labels = ["副本", "層數", "分數", "鑰石", "通關時間", "完成日期"]
-                header_widths = [200, 40, 40, 40, 60, 120]  # 固定每個欄位的寬度
-                header_margins = [0, 2, 2, 2, 2, 2]  # 對應每個欄位的左邊距：副本 | 層數 | 分數 | 鑰石 | 通關時間 | 完成日期
-                for i, (label, width, margin) in enumerate(zip(header_labels, header_widths, header_margins)):
-                    header_label = QLabel(label)
-                    header_label.setStyleSheet("color: #999999; font-weight: bold;")
-                    header_label.setFont(QFont("Noto Sans TC", 10))
-                    if i == 0:
-                        header_label.setAlignment(Qt.AlignLeft)
-                    else:
-                        header_label.setAlignment(Qt.AlignCenter)
-                    header_label.setMinimumWidth(width)
-                    header_label.setMaximumWidth(width)
-                    header_label.setContentsMargins(margin, 0, 0, 0)
-                    dungeon_header_layout.addWidget(header_label)
+                # 鑰石欄，對應父節點的鑰石欄
+                keystone_upgrades = recent_run.keystone_upgrades
+                keystone_label = QLabel(f"✓ +{keystone_upgrades}" if keystone_upgrades > 0 else "✗ 超時")
+                keystone_label.setProperty("keystone", "timed" if keystone_upgrades > 0 else "depleted")
+                keystone_label.setFont(get_font(10, True))
+                keystone_label.setAlignment(Qt.AlignCenter)
+                keystone_label.setMinimumWidth(40)
+                keystone_label.setMaximumWidth(40)
+                recent_layout.addWidget(keystone_label)
                 
-                content_layout.addWidget(dungeon_header)
+                # 通關時間欄
+                time_label = QLabel(recent_run.time_text)
+                time_label.setFont(get_font())
+                time_label.setAlignment(Qt.AlignCenter)
+                time_label.setMinimumWidth(60)
+                time_label.setMaximumWidth(60)
+                recent_layout.addWidget(time_label)
                 
-                if "error" in data:
-                    error_widget = QWidget()
-                    error_layout = QHBoxLayout(error_widget)
-                    error_layout.setContentsMargins(5, 10, 5, 10)
-                    
-                    error_label = QLabel("錯誤: " + data["error"])
-                    error_label.setStyleSheet("color: #FF5555;")
-                    error_label.setFont(QFont("Noto Sans TC", 10))
-                    error_layout.addWidget(error_label)
-                    
-                    content_layout.addWidget(error_widget)
-                else:
-                    best_runs = data.get("mythic_plus_best_runs", [])
-                    recent_runs = data.get("mythic_plus_recent_runs", [])
-                    
-                    if best_runs:
-                        dungeon_runs = {}
-                        for run in best_runs:
-                            dungeon_name = run["dungeon"]
-                            if dungeon_name not in dungeon_runs:
-                                dungeon_runs[dungeon_name] = []
-                            dungeon_runs[dungeon_name].append(run)
-                        
-                        for dungeon_name, runs in dungeon_runs.items():
-                            display_dungeon_name = DUNGEON_NAME_MAPPING.get(dungeon_name, dungeon_name)
-                            best_run = max(runs, key=lambda x: x["mythic_level"])
-                            formatted_time = DataFetcher.format_time(best_run["clear_time_ms"])
-                            dungeon_score = best_run.get("score", "N/A")
-                            keystone_upgrades = best_run.get("num_keystone_upgrades", 0)
-                            if keystone_upgrades > 0:
-                                keystone_text = f"✓ +{keystone_upgrades}"
-                                keystone_color = "#67FD0A"
-                            else:
-                                keystone_text = "✗ 超時"
-                                keystone_color = "#FF5555"
-                            
-                            dungeon_id = f"{char_id}_{dungeon_name.replace(' ', '_')}"
-                            
-                            dungeon_container = QWidget()
-                            dungeon_container.setObjectName(f"dungeonContent_{dungeon_id}")
-                            dungeon_container_layout = QVBoxLayout(dungeon_container)
-                            dungeon_container_layout.setContentsMargins(0, 0, 0, 0)
-                            dungeon_container_layout.setSpacing(0)
-                            
-                            run_widget = QWidget()
-                            run_widget.setStyleSheet("background-color: #202830; border-radius: 4px; margin-bottom: 1px;")
-                            run_layout = QHBoxLayout(run_widget)
-                            run_layout.setContentsMargins(5, 8, 5, 8)
-                            run_layout.setSpacing(0)
-                            
-                            detail_toggle = QToolButton()
-                            is_detail_expanded = self.dungeon_expansion_states.get(dungeon_id, False)
-                            detail_toggle.setText("▲" if is_detail_expanded else "▼")
-                            detail_toggle.setStyleSheet("""
-                                QToolButton {
-                                    background-color: transparent;
-                                    color: #999999;
-                                    border: none;
-                                    font-size: 12px;
-                                    font-weight: bold;
-                                }
-                                QToolButton:hover {
-                                    color: #FFFFFF;
-                                }
-                            """)
-                            detail_toggle.setToolTip(f'<span style="color: #FFFFFF;">{"收起詳細紀錄" if is_detail_expanded else "展開詳細紀錄"}</span>')
-                            detail_toggle.setObjectName(f"detailBtn_{dungeon_id}")
-                            detail_toggle.clicked.connect(lambda checked, did=dungeon_id: self.toggle_dungeon_detail(did))
-                            detail_toggle.setMinimumWidth(20)
-                            detail_toggle.setMaximumWidth(20)
-                            run_layout.addWidget(detail_toggle)
-                            
-                            name_label = QLabel(display_dungeon_name)
-                            name_label.setStyleSheet("font-weight: bold;")
-                            name_label.setFont(QFont("Noto Sans TC", 10))
-                            name_label.setMinimumWidth(180)
-                            name_label.setMaximumWidth(180)
-                            run_layout.addWidget(name_label)
-                            
-                            level = best_run["mythic_level"]
-                            level_label = QLabel(str(level))
-                            level_color = self.get_level_color(level)
-                            level_label.setStyleSheet(f"color: {level_color}; font-weight: bold; text-align: center;")
-                            level_label.setFont(QFont("Noto Sans TC", 10))
-                            level_label.setAlignment(Qt.AlignCenter)
-                            level_label.setMinimumWidth(40)
-                            level_label.setMaximumWidth(40)
-                            run_layout.addWidget(level_label)
-                            
-                            score_label = QLabel(f"{dungeon_score:.1f}" if isinstance(dungeon_score, (int, float)) else str(dungeon_score))
-                            score_color = self.get_score_color(dungeon_score) if isinstance(dungeon_score, (int, float)) else "#FFFFFF"
-                            score_label.setStyleSheet(f"color: {score_color}; font-weight: bold; text-align: center;")
-                            score_label.setFont(QFont("Noto Sans TC", 10))
-                            score_label.setAlignment(Qt.AlignCenter)
-                            score_label.setMinimumWidth(40)
-                            score_label.setMaximumWidth(40)
-                            run_layout.addWidget(score_label)
-                            
-                            keystone_label = QLabel(keystone_text)
-                            keystone_label.setStyleSheet(f"color: {keystone_color}; font-weight: bold; text-align: center;")
-                            keystone_label.setFont(QFont("Noto Sans TC", 10))
-                            keystone_label.setAlignment(Qt.AlignCenter)
-                            keystone_label.setMinimumWidth(40)
-                            keystone_label.setMaximumWidth(40)
-                            run_layout.addWidget(keystone_label)
-                            
-                            time_label = QLabel(formatted_time)
-                            time_label.setStyleSheet("text-align: center;")
-                            time_label.setFont(QFont("Noto Sans TC", 10))
-                            time_label.setAlignment(Qt.AlignCenter)
-                            time_label.setMinimumWidth(60)
-                            time_label.setMaximumWidth(60)
-                            run_layout.addWidget(time_label)
-                            
-                            date_label = QLabel(DataFetcher.format_datetime(best_run["completed_at"]))
-                            date_label.setStyleSheet("text-align: center;")
-                            date_label.setFont(QFont("Noto Sans TC", 10))
-                            date_label.setAlignment(Qt.AlignCenter)
-                            date_label.setMinimumWidth(120)
-                            date_label.setMaximumWidth(120)
-                            run_layout.addWidget(date_label)
-                            
-                            dungeon_container_layout.addWidget(run_widget)
-                            
-                            detail_frame = QFrame()
-                            detail_frame.setObjectName(f"detailFrame_{dungeon_id}")
-                            detail_frame.setStyleSheet("background-color: #1A2029; border-radius: 4px; margin-top: 1px;")
-                            detail_frame.setVisible(is_detail_expanded)
-                            
-                            detail_layout = QVBoxLayout(detail_frame)
-                            detail_layout.setContentsMargins(5, 5, 5, 5)
-                            detail_layout.setSpacing(2)
-                            
-                            detail_title = QLabel("最近紀錄")
-                            detail_title.setStyleSheet("color: #999999; font-size: 11px; margin-top: 2px;")
-                            detail_title.setFont(QFont("Noto Sans TC", 10))
-                            detail_layout.addWidget(detail_title)
-                            
-                            dungeon_recent_runs = [run for run in recent_runs if run["dungeon"] == dungeon_name]
-                            dungeon_recent_runs = sorted(dungeon_recent_runs, key=lambda x: x["completed_at"], reverse=True)
-                            
-                            if dungeon_recent_runs:
-                                for recent_run in dungeon_recent_runs:
-                                    recent_widget = QWidget()
-                                    recent_layout = QHBoxLayout(recent_widget)
-                                    recent_layout.setContentsMargins(5, 8, 5, 8)
-                                    recent_layout.setSpacing(0)
-                                    
-                                    # 空白佔位符，對應父節點的展開按鈕
-                                    spacer_label = QLabel("")
-                                    spacer_label.setMinimumWidth(20)
-                                    spacer_label.setMaximumWidth(20)
-                                    recent_layout.addWidget(spacer_label)
-                                    
-                                    # 空白佔位符，對應父節點的副本名稱欄
-                                    spacer_label2 = QLabel("")
-                                    spacer_label2.setMinimumWidth(180)
-                                    spacer_label2.setMaximumWidth(180)
-                                    recent_layout.addWidget(spacer_label2)
-                                    
-                                    # 層數欄，對應父節點的層數欄
-                                    level_label = QLabel(str(recent_run["mythic_level"]))
-                                    level_color = self.get_level_color(recent_run["mythic_level"])
-                                    level_label.setStyleSheet(f"color: {level_color}; font-weight: bold; text-align: center;")
-                                    level_label.setFont(QFont("Noto Sans TC", 10))
-                                    level_label.setAlignment(Qt.AlignCenter)
-                                    level_label.setMinimumWidth(40)
-                                    level_label.setMaximumWidth(40)
-                                    recent_layout.addWidget(level_label)
-                                    
-                                    # 空白佔位符，對應父節點的分數欄
-                                    spacer_label3 = QLabel("")
-                                    spacer_label3.setMinimumWidth(40)
-                                    spacer_label3.setMaximumWidth(40)
-                                    recent_layout.addWidget(spacer_label3)
-                                    
-                                    # 鑰石欄，對應父節點的鑰石欄
-                                    keystone_upgrades = recent_run.get("num_keystone_upgrades", 0)
-                                    if keystone_upgrades > 0:
-                                        keystone_text = f"✓ +{keystone_upgrades}"
-                                        keystone_color = "#67FD0A"
-                                    else:
-                                        keystone_text = "✗ 超時"
-                                        keystone_color = "#FF5555"
-                                    keystone_label = QLabel(keystone_text)
-                                    keystone_label.setStyleSheet(f"color: {keystone_color}; font-weight: bold; text-align: center;")
-                                    keystone_label.setFont(QFont("Noto Sans TC", 10))
-                                    keystone_label.setAlignment(Qt.AlignCenter)
-                                    keystone_label.setMinimumWidth(40)
-                                    keystone_label.setMaximumWidth(40)
-                                    recent_layout.addWidget(keystone_label)
-                                    
-                                    # 通關時間欄
-                                    time_str = DataFetcher.format_time(recent_run.get("clear_time_ms", 0)) if "clear_time_ms" in recent_run else "未完成  "
-                                    time_label = QLabel(time_str)
-                                    time_label.setStyleSheet("text-align: center;")
-                                    time_label.setFont(QFont("Noto Sans TC", 10))
-                                    time_label.setAlignment(Qt.AlignCenter)
-                                    time_label.setMinimumWidth(60)
-                                    time_label.setMaximumWidth(60)
-                                    recent_layout.addWidget(time_label)
-                                    
-                                    # 完成日期欄
-                                    date_label = QLabel(DataFetcher.format_datetime(recent_run["completed_at"]))
-                                    date_label.setStyleSheet("text-align: center;")
-                                    date_label.setFont(QFont("Noto Sans TC", 10))
-                                    date_label.setAlignment(Qt.AlignCenter)
-                                    date_label.setMinimumWidth(120)
-                                    date_label.setMaximumWidth(120)
-                                    recent_layout.addWidget(date_label)
-                                    
-                                    detail_layout.addWidget(recent_widget)
-                            else:
-                                no_record = QLabel("無最近紀錄")
-                                no_record.setStyleSheet("color: #999999; padding: 3px; text-align: center;")
-                                no_record.setFont(QFont("Noto Sans TC", 10))
-                                no_record.setAlignment(Qt.AlignCenter)
-                                detail_layout.addWidget(no_record)
-                            
-                            dungeon_container_layout.addWidget(detail_frame)
-                            content_layout.addWidget(dungeon_container)
-                            
-                            if dungeon_name != list(dungeon_runs.keys())[-1]:
-                                separator = QFrame()
-                                separator.setFrameShape(QFrame.HLine)
-                                separator.setFrameShadow(QFrame.Sunken)
-                                separator.setStyleSheet("background-color: #2A2F36; max-height: 1px;")
-                                content_layout.addWidget(separator)
-                    else:
-                        no_record = QLabel("無紀錄")
-                        no_record.setStyleSheet("color: #999999; padding: 10px; text-align: center;")
-                        no_record.setFont(QFont("Noto Sans TC", 10))
-                        no_record.setAlignment(Qt.AlignCenter)
-                        content_layout.addWidget(no_record)
+                # 完成日期欄
+                date_label = QLabel(recent_run.date_text)
+                date_label.setFont(get_font())
+                date_label.setAlignment(Qt.AlignCenter)
+                date_label.setMinimumWidth(120)
+                date_label.setMaximumWidth(120)
+                recent_layout.addWidget(date_label)
                 
-                char_layout.addWidget(content_frame)            
-                self.scroll_layout.addWidget(char_widget)
-
-            self.scroll_layout.addStretch()
-        except Exception as e:
-            error_message = f"發生錯誤: {str(e)}\n{traceback.format_exc()}"
-            error_label = QLabel(error_message)
-            error_label.setStyleSheet("color: #FF5555; padding: 20px;")
-            error_label.setFont(QFont("Noto Sans TC", 10))
-            self.clear_scroll_content()
-            self.scroll_layout.addWidget(error_label)
-            self.status_bar.showMessage("顯示資料時發生錯誤", 5000)
+                detail_layout.addWidget(recent_widget)
+        else:
+            no_record = QLabel("無最近紀錄")
+            no_record.setObjectName("noRecentRecord")
+            no_record.setFont(get_font())
+            no_record.setAlignment(Qt.AlignCenter)
+            detail_layout.addWidget(no_record)
 
     def get_level_color(self, level):
-        if level >= 20:
-            return "#E16AFF"
-        elif level >= 15:
-            return "#4C97FC"
-        elif level >= 10:
-            return "#1CE2B2"
-        elif level >= 5:
-            return "#67FD0A"
-        else:
-            return "#FFFFFF"
+        return TIER_COLORS[get_tier(level, LEVEL_TIERS)]
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
-
-    # 設置應用程式的全局圖標（包括工作列）
-    icon_path = resource_path("icon.ico")
-    print("應用程式圖標路徑:", icon_path)
-    icon = QIcon(icon_path)
-    if icon.isNull():
-        print("應用程式圖標載入失敗:", icon_path)
-    else:
-        print("應用程式圖標載入成功:", icon_path)
-    app.setWindowIcon(icon)
-
-    font_db = QFontDatabase()
-    font_path = resource_path("NotoSansTC-SemiBold.ttf")
-    font_id = font_db.addApplicationFont(font_path)
-    if font_id == -1:
-        print("無法載入 Noto Sans TC SemiBold 字型")
-    else:
-        font_families = font_db.applicationFontFamilies(font_id)
-        if font_families:
-            app.setFont(QFont("Noto Sans TC", 10))
+    startup_profiler.mark("建立 QApplication")
 
     window = RaiderIOMainWindow()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
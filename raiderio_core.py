@@ -0,0 +1,1613 @@
+"""Raider.IO 角色資料的查詢、快取與解析，不依賴 Qt，可供圖形介面與命令列共用
+
+命令列用法：
+    python raiderio_core.py [--format jsonl|csv] [--file characters.txt] [--workers 8]
+"""
+import sys
+import os
+import json
+import time
+import random
+import functools
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+from datetime import datetime, timedelta, timezone
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+
+# 獲取 characters.txt 的儲存路徑（用戶家目錄下的 Documents 資料夾）
+def get_characters_file_path():
+    documents_path = os.path.expanduser("~/Documents")
+    if not os.path.exists(documents_path):
+        os.makedirs(documents_path)
+    return os.path.join(documents_path, "characters.txt")
+
+# 獲取本機資料夾（與 characters.txt 同樣放在 Documents 底下），存放角色名單資料庫
+def get_data_dir():
+    data_path = os.path.join(os.path.expanduser("~/Documents"), "RaiderIOTool")
+    if not os.path.exists(data_path):
+        os.makedirs(data_path)
+    return data_path
+
+# 獲取本機快取資料夾
+def get_cache_dir():
+    cache_path = os.path.join(get_data_dir(), "cache")
+    if not os.path.exists(cache_path):
+        os.makedirs(cache_path)
+    return cache_path
+
+# 同時查詢角色資料的最大連線數
+MAX_CONCURRENT_REQUESTS = 8
+
+# 每個主機保留的 keep-alive 連線數，至少要能容納同時進行的請求
+HTTP_POOL_SIZE = MAX_CONCURRENT_REQUESTS
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """取得共用的 HTTP Session，所有 Raider.IO 與圖片請求共用同一個連線池"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                # requests 在第一次發出請求時才載入，不拖慢啟動
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util import make_headers
+                session = requests.Session()
+                # 依主機分別保留連線，避免每次請求重新進行 TCP/TLS 握手
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                # 只宣告 urllib3 能解壓的編碼（安裝 brotli 時會自動包含 br）
+                session.headers.update(make_headers(accept_encoding=True))
+                _http_session = session
+    return _http_session
+
+# Raider.IO API 位址，可由環境變數 RAIDERIO_API_BASE 改為本機測試伺服器
+RAIDERIO_API_BASE = os.environ.get("RAIDERIO_API_BASE", "https://raider.io/api/v1").rstrip("/")
+
+# Raider.IO API 金鑰（可選），可由環境變數 RAIDERIO_API_KEY 設定以取得較高的請求配額
+RAIDERIO_API_KEY = os.environ.get("RAIDERIO_API_KEY", "")
+
+# 每秒請求上限：Raider.IO 依是否使用 API 金鑰而定，其他主機（圖片）另外計算
+RAIDERIO_REQUESTS_PER_SECOND = 15 if RAIDERIO_API_KEY else 4
+DEFAULT_REQUESTS_PER_SECOND = 20
+
+# 遇到 429 / 5xx 時的重試次數與指數退避的基準、上限秒數
+MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30
+
+# 單一角色查詢的時限（秒），從第一次送出請求開始計算，包含重試；超過時該角色顯示錯誤，不拖慢整次更新
+CHARACTER_TIMEOUT = 8
+
+# 整次更新的時限（秒）；超過時尚未完成的角色顯示逾時錯誤
+REFRESH_TIMEOUT = 300
+
+class RefreshCancelled(Exception):
+    """更新工作已被取消或超過整體時限"""
+
+class CancelToken:
+    """更新工作的取消旗標與整體時限：其他執行緒呼叫 cancel() 後，尚未送出的請求不再送出，
+    限流與重試的等待也會立即結束"""
+
+    def __init__(self, timeout=None):
+        self._event = threading.Event()
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self):
+        """距離整體時限的秒數，沒有時限時回傳 None"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        if self.cancelled:
+            raise RefreshCancelled("已取消更新")
+        if self.expired:
+            raise RefreshCancelled("已超過更新時限")
+
+    def sleep(self, seconds):
+        """等待 seconds 秒；期間被取消或到達時限時提前結束並拋出 RefreshCancelled"""
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
+
+class TokenBucket:
+    """執行緒安全的權杖桶限流器，所有執行緒共用同一個配額"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, token=None):
+        """取得一個權杖，配額不足或伺服器要求暫停時等待；回傳等待的秒數。
+        token 被取消時停止等待並拋出 RefreshCancelled"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._blocked_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._blocked_until - now
+            if token is not None:
+                token.sleep(wait)
+            else:
+                time.sleep(wait)
+            waited += wait
+
+    def block_for(self, seconds):
+        """依伺服器的 Retry-After 暫停所有請求"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._blocked_until
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(host):
+    """取得該主機共用的限流器"""
+    with _rate_limiters_lock:
+        if host not in _rate_limiters:
+            if host == urlsplit(RAIDERIO_API_BASE).hostname:
+                rate = RAIDERIO_REQUESTS_PER_SECOND
+            else:
+                rate = DEFAULT_REQUESTS_PER_SECOND
+            _rate_limiters[host] = TokenBucket(rate)
+        return _rate_limiters[host]
+
+def parse_retry_after(value):
+    """解析 Retry-After 標頭（秒數或 HTTP 日期），無法解析時回傳 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+# 效能統計保留的紀錄筆數上限（超過時捨棄最舊的紀錄）
+METRICS_MAX_RECORDS = 20000
+
+class _NullTimer:
+    """統計關閉時共用的空計時器"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("metrics", "kind", "name", "fields", "start")
+
+    def __init__(self, metrics, kind, name, fields):
+        self.metrics = metrics
+        self.kind = kind
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.kind, self.name, time.perf_counter() - self.start, **self.fields)
+        return False
+
+class Metrics:
+    """收集網路請求、解析與繪製的耗時、傳輸量與快取命中次數；
+    關閉時 timer() 回傳共用的空物件、record() 與 count() 直接返回，幾乎沒有額外負擔"""
+
+    # 計算命中率的快取，對應 count() 的名稱前綴；除了 miss 以外都算命中
+    CACHES = {"response_cache": "API 回應快取", "image_memory": "圖片記憶體快取", "image_disk": "圖片磁碟快取"}
+    KINDS = {"request": "網路請求", "rate_limit": "限流等待", "parse": "解析", "render": "繪製", "image": "圖片解碼"}
+
+    def __init__(self, enabled=False, max_records=METRICS_MAX_RECORDS):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._counters = Counter()
+
+    def timer(self, kind, name, **fields):
+        """以 with 區塊計時，結束時記錄一筆 kind / name 的耗時"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, kind, name, fields)
+
+    def record(self, kind, name, seconds, **fields):
+        if not self.enabled:
+            return
+        entry = {"ts": time.time(), "kind": kind, "name": name, "ms": round(seconds * 1000, 3)}
+        entry.update(fields)
+        with self._lock:
+            self._records.append(entry)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += amount
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self._counters.clear()
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def summary(self):
+        """回傳各類別的次數與耗時統計、傳輸量與快取命中率"""
+        with self._lock:
+            records = list(self._records)
+            counters = dict(self._counters)
+
+        durations = {}
+        transferred = 0
+        for entry in records:
+            durations.setdefault(entry["kind"], []).append(entry["ms"])
+            transferred += entry.get("bytes", 0)
+        kinds = {}
+        for kind, values in durations.items():
+            values.sort()
+            kinds[kind] = {
+                "count": len(values),
+                "total_ms": round(sum(values), 1),
+                "avg_ms": round(sum(values) / len(values), 2),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+                "max_ms": round(values[-1], 2),
+            }
+
+        hit_ratios = {}
+        for cache in self.CACHES:
+            total = sum(value for name, value in counters.items() if name.startswith(cache + "."))
+            if total:
+                hit_ratios[cache] = round(1 - counters.get(cache + ".miss", 0) / total, 3)
+        return {"kinds": kinds, "bytes": transferred, "counters": counters, "hit_ratios": hit_ratios}
+
+    def format_summary(self):
+        """以文字列出統計結果，供狀態列提示與診斷視窗顯示"""
+        if not self.enabled:
+            return "效能統計未開啟"
+        summary = self.summary()
+        if not summary["kinds"] and not summary["counters"]:
+            return "尚無統計資料"
+        lines = []
+        for kind, label in self.KINDS.items():
+            stats = summary["kinds"].get(kind)
+            if stats:
+                lines.append(f"{label}：{stats['count']} 次，合計 {stats['total_ms']:.0f} ms，"
+                             f"平均 {stats['avg_ms']:.1f} ms，p95 {stats['p95_ms']:.1f} ms，最長 {stats['max_ms']:.1f} ms")
+        lines.append(f"下載量：{summary['bytes'] / 1024:.1f} KB")
+        for cache, label in self.CACHES.items():
+            if cache in summary["hit_ratios"]:
+                lines.append(f"{label}命中率：{summary['hit_ratios'][cache] * 100:.0f}%")
+        return "\n".join(lines)
+
+    def export_jsonl(self, path):
+        """將每筆紀錄與最後的計數器寫成 JSON lines，回傳寫入的筆數"""
+        records = self.records()
+        with open(path, "w", encoding="utf-8") as file:
+            for entry in records:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            file.write(json.dumps({"ts": time.time(), "kind": "counters", **self.summary()["counters"]},
+                                  ensure_ascii=False) + "\n")
+        return len(records)
+
+# 全域的效能統計，以環境變數 RAIDERIO_METRICS=1 開啟（也可在介面的診斷視窗切換）
+metrics = Metrics(os.environ.get("RAIDERIO_METRICS") == "1")
+
+def timed(kind, name):
+    """以 metrics 計時整個函式的裝飾器；統計關閉時只多一次判斷"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with metrics.timer(kind, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def request_label(url):
+    """統計用的請求名稱：Raider.IO API 取路徑，其他（圖片）取主機名稱"""
+    if url.startswith(RAIDERIO_API_BASE):
+        return url[len(RAIDERIO_API_BASE):]
+    return urlsplit(url).hostname or url
+
+def http_get(url, params=None, headers=None, timeout=10, token=None, budget=None):
+    """所有網路請求的共用入口：套用限流與 API 金鑰，遇到 429 / 5xx 時以加入隨機抖動的指數退避重試。
+    token 為可取消的更新工作（見 CancelToken）；budget 為含重試的總時限（秒），
+    從第一次送出請求開始計算（不含限流等待），用完時放棄重試，已無時間送出請求時拋出 TimeoutError"""
+    if RAIDERIO_API_KEY and url.startswith(RAIDERIO_API_BASE):
+        params = dict(params or {}, access_key=RAIDERIO_API_KEY)
+    limiter = get_rate_limiter(urlsplit(url).hostname)
+    give_up_at = None
+    for attempt in range(MAX_RETRIES + 1):
+        if token is not None:
+            token.check()
+        waited = limiter.acquire(token)
+        if budget is not None:
+            now = time.monotonic()
+            give_up_at = give_up_at or now + budget
+            if now >= give_up_at:
+                raise TimeoutError(f"查詢逾時（超過 {budget:g} 秒）")
+            timeout = min(timeout, give_up_at - now)
+        if token is not None and token.deadline is not None:
+            timeout = min(timeout, max(0.1, token.remaining()))
+        if not metrics.enabled:
+            response = get_http_session().get(url, params=params, headers=headers, timeout=timeout)
+        else:
+            label = request_label(url)
+            if waited:
+                metrics.record("rate_limit", label, waited)
+            start = time.perf_counter()
+            try:
+                response = get_http_session().get(url, params=params, headers=headers, timeout=timeout)
+            except Exception as e:
+                metrics.record("request", label, time.perf_counter() - start, attempt=attempt, error=str(e))
+                raise
+            # bytes 為實際傳輸量（壓縮後），ttfb_ms 為收到回應標頭前的時間
+            metrics.record("request", label, time.perf_counter() - start, attempt=attempt,
+                           status=response.status_code,
+                           bytes=int(response.headers.get("Content-Length") or len(response.content)),
+                           ttfb_ms=round(response.elapsed.total_seconds() * 1000, 3))
+        if (response.status_code != 429 and response.status_code < 500) or attempt == MAX_RETRIES:
+            return response
+
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is not None:
+            delay = min(delay, RETRY_BACKOFF_MAX)
+            limiter.block_for(delay)
+        else:
+            backoff = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt)
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+        if give_up_at is not None and time.monotonic() + delay >= give_up_at:
+            return response  # 時限內已無法重試，回傳最後一次的錯誤回應
+        if token is not None:
+            token.sleep(delay)
+        else:
+            time.sleep(delay)
+    return response
+
+# 角色資料快取的有效時間（秒），在有效時間內重複更新不會發出任何請求
+PROFILE_CACHE_TTL = 300
+
+# 回應快取的容量上限（位元組），超過時淘汰最久未使用的項目
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+class DiskCache:
+    """以 SQLite 儲存的磁碟快取，超過容量上限時依最久未使用 (LRU) 的順序淘汰"""
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                meta TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """回傳 (value, meta, stored_at)，不存在時回傳 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, stored_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0], json.loads(row[1]), row[2]
+
+    def put(self, key, value, meta=None):
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, meta, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, json.dumps(meta or {}), now, now, len(value)))
+            self._total_bytes += len(value) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key):
+        """重新驗證成功（304）後更新儲存時間，延長快取有效期"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._total_bytes -= size
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """取得共用的 API 回應快取，無法建立時回傳 None（直接改為不使用快取）"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                try:
+                    path = os.path.join(get_cache_dir(), "responses.sqlite3")
+                    _response_cache = DiskCache(path, RESPONSE_CACHE_MAX_BYTES)
+                except Exception as e:
+                    print(f"無法建立回應快取: {str(e)}")
+                    return None
+    return _response_cache
+
+def fetch_json_cached(url, params, cache_key, ttl, timeout=10, token=None, budget=None):
+    """取得 JSON 資料：有效期內直接使用快取，過期時以 ETag / Last-Modified 進行條件式請求；
+    token 與 budget 同 http_get"""
+    cache = get_response_cache()
+    cached = cache.get(cache_key) if cache else None
+    headers = {}
+    if cached:
+        body, meta, stored_at = cached
+        if time.time() - stored_at < ttl:
+            metrics.count("response_cache.fresh")
+            return json.loads(body)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = http_get(url, params=params, headers=headers, timeout=timeout, token=token, budget=budget)
+    if response.status_code == 304 and cached:
+        metrics.count("response_cache.revalidated")
+        cache.touch(cache_key)
+        return json.loads(cached[0])
+    metrics.count("response_cache.miss")
+    response.raise_for_status()
+    data = response.json()
+    if cache:
+        cache.put(cache_key, response.content, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        })
+    return data
+
+# 詞綴查詢使用的地區
+AFFIX_REGION = "tw"
+
+# 詞綴圖示的網址前綴，可由環境變數 RAIDERIO_ICON_BASE 改為本機測試伺服器
+AFFIX_ICON_BASE = os.environ.get("RAIDERIO_ICON_BASE", "https://render.worldofwarcraft.com/us/icons/56").rstrip("/")
+
+# 各地區每週重置時間（UTC 星期，週一為 0；UTC 小時）
+WEEKLY_RESET_TIMES = {
+    "us": (1, 15),
+    "eu": (2, 4),
+    "tw": (2, 23),
+    "kr": (2, 23),
+    "cn": (2, 23),
+}
+
+def get_weekly_reset(region, now=None):
+    """回傳該地區最近一次每週重置的 UTC 時間"""
+    now = now or datetime.now(timezone.utc)
+    weekday, hour = WEEKLY_RESET_TIMES.get(region, WEEKLY_RESET_TIMES["us"])
+    reset = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    reset -= timedelta(days=(now.weekday() - weekday) % 7)
+    if reset > now:
+        reset -= timedelta(days=7)
+    return reset
+
+def load_cached_affixes(region):
+    """讀取上次儲存的詞綴，回傳 (資料, 是否為本週資料)；沒有快取時資料為 None"""
+    cache = get_response_cache()
+    cached = cache.get(f"affixes:{region}") if cache else None
+    if not cached:
+        return None, False
+    body, meta, _ = cached
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None, False
+    return data, meta.get("reset") == get_weekly_reset(region).isoformat()
+
+def fetch_affixes(region):
+    """向 Raider.IO 查詢本週詞綴，並以每週重置時間標記後存入快取"""
+    url = f"{RAIDERIO_API_BASE}/mythic-plus/affixes"
+    response = http_get(url, params={"region": region, "locale": region}, timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    cache = get_response_cache()
+    if cache:
+        cache.put(f"affixes:{region}", response.content, {"reset": get_weekly_reset(region).isoformat()})
+    return data
+
+def download_bytes(url, timeout=10):
+    """透過共用連線池下載檔案內容（縮圖、詞綴圖示）"""
+    response = http_get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+# 定義副本名稱映射表（英文 -> 繁體中文）
+DUNGEON_NAME_MAPPING = {
+    "Darkflame Cleft": "暗焰裂隙",
+    "Operation: Floodgate": "水閘行動",
+    "Cinderbrew Meadery": "燼釀酒莊",
+    "The MOTHERLODE!!": "晶礦母脈",
+    "The Rookery": "鴉巢",
+    "Theater of Pain": "苦痛劇場",
+    "Priory of the Sacred Flame": "聖焰隱修院",
+    "Mechagon Workshop": "機械岡行動：工坊"
+}
+
+@dataclass(frozen=True, slots=True)
+class RunRecord:
+    """單次鑰石紀錄，時間欄位已預先解析與格式化"""
+    dungeon: str
+    mythic_level: int
+    score: float = None
+    keystone_upgrades: int = 0
+    clear_time_ms: int = None
+    completed_at: datetime = None
+    time_text: str = ""
+    date_text: str = ""
+
+@dataclass(frozen=True, slots=True)
+class DungeonSummary:
+    """單一副本的最佳紀錄與依完成時間排序（新到舊）的最近紀錄"""
+    name: str
+    display_name: str
+    best_run: RunRecord
+    recent_runs: tuple = ()
+
+# 角色資料分層查詢的欄位：層名稱 -> (fields 參數, 回應中的鍵)。summary 只含總分（職業與縮圖等基本資料每次都會回傳），
+# 用於收起的卡片；best 在卡片展開時、recent 在副本詳細紀錄展開時才查詢，各層分開快取
+PROFILE_TIERS = {
+    "summary": ("mythic_plus_scores_by_season:current", "mythic_plus_scores_by_season"),
+    "best": ("mythic_plus_best_runs", "mythic_plus_best_runs"),
+    "recent": ("mythic_plus_recent_runs", "mythic_plus_recent_runs"),
+}
+ALL_PROFILE_TIERS = tuple(PROFILE_TIERS)
+
+def normalize_tiers(tiers):
+    """補上必要的層並依固定順序排列：一定包含 summary，recent 需要 best（最近紀錄依最佳紀錄的副本分組）"""
+    tiers = set(tiers) | {"summary"}
+    if "recent" in tiers:
+        tiers.add("best")
+    return tuple(tier for tier in ALL_PROFILE_TIERS if tier in tiers)
+
+@dataclass(frozen=True, slots=True)
+class CharacterProfile:
+    """解析後的角色資料；dungeons 依最佳紀錄出現順序以副本名稱為鍵。
+    tiers 為已載入的資料層：沒有 best 時 dungeons 為空，沒有 recent 時各副本的 recent_runs 為空"""
+    region: str
+    realm: str
+    name: str
+    class_name: str = "Unknown"
+    thumbnail_url: str = ""
+    score: float = None
+    dungeons: dict = field(default_factory=dict)
+    error: str = None
+    tiers: tuple = ALL_PROFILE_TIERS
+
+def format_time(milliseconds):
+    seconds = milliseconds / 1000
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+def format_datetime(datetime_str):
+    try:
+        dt = datetime.strptime(datetime_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+        return dt.strftime("%Y/%m/%d %H:%M")
+    except Exception:
+        return datetime_str
+
+def parse_run(run):
+    clear_time_ms = run.get("clear_time_ms")
+    completed_at_raw = run.get("completed_at", "")
+    try:
+        completed_at = datetime.strptime(completed_at_raw, "%Y-%m-%dT%H:%M:%S.%fZ")
+        date_text = completed_at.strftime("%Y/%m/%d %H:%M")
+    except (TypeError, ValueError):
+        completed_at = None
+        date_text = completed_at_raw
+    score = run.get("score")
+    return RunRecord(
+        dungeon=run["dungeon"],
+        mythic_level=run["mythic_level"],
+        score=score if isinstance(score, (int, float)) else None,
+        keystone_upgrades=run.get("num_keystone_upgrades", 0),
+        clear_time_ms=clear_time_ms,
+        completed_at=completed_at,
+        time_text=format_time(clear_time_ms) if clear_time_ms is not None else "未完成",
+        date_text=date_text,
+    )
+
+def parse_character_profile(region, realm, name, data, tiers=ALL_PROFILE_TIERS):
+    """將 Raider.IO 的角色 JSON 解析為 CharacterProfile（在背景執行緒執行一次），
+    預先依副本分組最佳與最近紀錄，介面只需讀取結果；tiers 為 data 包含的資料層"""
+    if "error" in data:
+        return CharacterProfile(region, realm, name, error=data["error"])
+
+    mythic_plus_scores = data.get("mythic_plus_scores_by_season", [])
+    overall_score = mythic_plus_scores[0]["scores"]["all"] if mythic_plus_scores else None
+
+    # 只解析已查詢的資料層（回應包含其他欄位時也不使用，結果與分層查詢一致）
+    best_runs = {}
+    for run in data.get("mythic_plus_best_runs", []) if "best" in tiers else ():
+        current = best_runs.get(run["dungeon"])
+        if current is None or run["mythic_level"] > current["mythic_level"]:
+            best_runs[run["dungeon"]] = run
+
+    recent_runs = {}
+    for run in data.get("mythic_plus_recent_runs", []) if "recent" in tiers else ():
+        recent_runs.setdefault(run["dungeon"], []).append(run)
+
+    dungeons = {}
+    for dungeon_name, best_run in best_runs.items():
+        dungeon_recent_runs = sorted(recent_runs.get(dungeon_name, []), key=lambda x: x["completed_at"], reverse=True)
+        dungeons[dungeon_name] = DungeonSummary(
+            name=dungeon_name,
+            display_name=DUNGEON_NAME_MAPPING.get(dungeon_name, dungeon_name),
+            best_run=parse_run(best_run),
+            recent_runs=tuple(parse_run(run) for run in dungeon_recent_runs),
+        )
+
+    return CharacterProfile(
+        region, realm, name,
+        class_name=data.get("class", "Unknown"),
+        thumbnail_url=data.get("thumbnail_url", "") or "",
+        score=overall_score if isinstance(overall_score, (int, float)) else None,
+        dungeons=dungeons,
+        tiers=tuple(tiers),
+    )
+
+# characters.txt 的檔頭說明
+CHARACTERS_FILE_HEADER = "# 角色資料格式：地區,伺服器,角色名稱\n"
+
+def read_characters_file(filepath=None):
+    """讀取角色名單，回傳 [(region, realm, name), ...]；檔案不存在時建立只含說明的空檔案。
+    讀寫失敗時拋出 OSError，由呼叫端決定如何顯示"""
+    filepath = filepath or get_characters_file_path()
+    if not os.path.exists(filepath):
+        with open(filepath, "w", encoding="utf-8") as file:
+            file.write(CHARACTERS_FILE_HEADER)
+        return []
+
+    characters = []
+    with open(filepath, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                parts = line.split(",")
+                if len(parts) == 3:
+                    region, realm, name = [p.strip() for p in parts]
+                    characters.append((region, realm, name))
+    return characters
+
+@dataclass(frozen=True, slots=True)
+class RosterEntry:
+    """角色名單中的一筆角色；id 在修改名稱時不變"""
+    id: int
+    region: str
+    realm: str
+    name: str
+    group: str = ""
+    priority: int = 0
+    last_fetched: float = None
+    guild: str = ""
+    departed_at: float = None
+    last_active: float = None
+
+    @property
+    def key(self):
+        return (self.region, self.realm, self.name)
+
+class RosterStore:
+    """以 SQLite 儲存的角色名單：(region, realm, name) 不分大小寫唯一，
+    依優先順序與加入順序排列，新增、修改與刪除只更動相關的列"""
+
+    _COLUMNS = "id, region, realm, name, group_name, priority, last_fetched, guild, departed_at, last_active"
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS characters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                region TEXT NOT NULL COLLATE NOCASE,
+                realm TEXT NOT NULL COLLATE NOCASE,
+                name TEXT NOT NULL COLLATE NOCASE,
+                group_name TEXT NOT NULL DEFAULT '',
+                priority INTEGER NOT NULL DEFAULT 0,
+                last_fetched REAL,
+                added_at REAL NOT NULL,
+                UNIQUE (region, realm, name)
+            )
+        """)
+        # 公會匯入加入的欄位：所屬公會與離開公會的時間（仍在公會或非公會匯入時為 NULL）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(characters)")}
+        if "guild" not in columns:
+            self._conn.execute("ALTER TABLE characters ADD COLUMN guild TEXT NOT NULL DEFAULT '' COLLATE NOCASE")
+        if "departed_at" not in columns:
+            self._conn.execute("ALTER TABLE characters ADD COLUMN departed_at REAL")
+        # 最近一筆鑰石紀錄的完成時間，背景自動更新以此判斷角色是否活躍
+        if "last_active" not in columns:
+            self._conn.execute("ALTER TABLE characters ADD COLUMN last_active REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_characters_guild ON characters (guild)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_characters_order ON characters (priority DESC, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_characters_group ON characters (group_name, priority DESC, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_characters_fetched ON characters (last_fetched)")
+        self._conn.commit()
+
+    def entries(self, group=None, include_departed=False):
+        """回傳 RosterEntry 列表，可只取某個群組；預設不包含已離開公會的角色"""
+        conditions = []
+        params = []
+        if group is not None:
+            conditions.append("group_name = ?")
+            params.append(group)
+        if not include_departed:
+            conditions.append("departed_at IS NULL")
+        query = f"SELECT {self._COLUMNS} FROM characters"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY priority DESC, id", params).fetchall()
+        return [RosterEntry(*row) for row in rows]
+
+    def characters(self, group=None):
+        """回傳 [(region, realm, name), ...]，順序與 entries() 相同"""
+        return [entry.key for entry in self.entries(group)]
+
+    def sync_guild(self, guild, members, selected, group=""):
+        """以單一交易同步公會成員：selected 中尚未在名單的角色批次加入，
+        名單中仍在 members 的角色標記為該公會成員，已不在 members 的則標記為離開（保留紀錄）。
+        回傳 (新增數量, 標記離開數量)"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS guild_members (
+                        region TEXT NOT NULL COLLATE NOCASE,
+                        realm TEXT NOT NULL COLLATE NOCASE,
+                        name TEXT NOT NULL COLLATE NOCASE,
+                        PRIMARY KEY (region, realm, name)
+                    )
+                """)
+                self._conn.execute("DELETE FROM guild_members")
+                self._conn.executemany("INSERT OR IGNORE INTO guild_members (region, realm, name) VALUES (?, ?, ?)", members)
+
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO characters (region, realm, name, group_name, priority, added_at, guild) "
+                    "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                    [(region, realm, name, group, now, guild) for region, realm, name in selected])
+                added = self._conn.total_changes - before
+
+                is_member = ("EXISTS (SELECT 1 FROM guild_members m WHERE m.region = characters.region "
+                             "AND m.realm = characters.realm AND m.name = characters.name)")
+                self._conn.execute(
+                    f"UPDATE characters SET guild = ?, departed_at = NULL WHERE (guild = ? OR guild = '') AND {is_member}",
+                    (guild, guild))
+                departed = self._conn.execute(
+                    f"UPDATE characters SET departed_at = ? WHERE guild = ? AND departed_at IS NULL AND NOT {is_member}",
+                    (now, guild)).rowcount
+        return added, departed
+
+    def get(self, region, realm, name):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM characters WHERE region = ? AND realm = ? AND name = ?",
+                (region, realm, name)).fetchone()
+        return RosterEntry(*row) if row else None
+
+    def groups(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT group_name FROM characters WHERE group_name != '' ORDER BY group_name").fetchall()
+        return [row[0] for row in rows]
+
+    def add(self, region, realm, name, group="", priority=0):
+        """新增角色，已存在時回傳 False"""
+        return self.add_many([(region, realm, name)], group, priority) == 1
+
+    def add_many(self, characters, group="", priority=0):
+        """以單一交易批次新增角色，略過已存在的角色，回傳實際新增的數量"""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO characters (region, realm, name, group_name, priority, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(region, realm, name, group, priority, now) for region, realm, name in characters])
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def apply_changes(self, added=(), updated=(), removed=()):
+        """在單一交易內套用角色管理視窗的變更：
+        added 為 (region, realm, name, group, priority)，updated 為 (id, region, realm, name, group, priority)，
+        removed 為 id。名稱與其他角色重複時整批取消並拋出 ValueError"""
+        now = time.time()
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM characters WHERE id = ?", [(entry_id,) for entry_id in removed])
+                    self._conn.executemany(
+                        "UPDATE characters SET region = ?, realm = ?, name = ?, group_name = ?, priority = ? WHERE id = ?",
+                        [(region, realm, name, group, priority, entry_id)
+                         for entry_id, region, realm, name, group, priority in updated])
+                    self._conn.executemany(
+                        "INSERT INTO characters (region, realm, name, group_name, priority, added_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(region, realm, name, group, priority, now) for region, realm, name, group, priority in added])
+            except sqlite3.IntegrityError as e:
+                raise ValueError("名單中有重複的角色") from e
+
+    def remove(self, entry_id):
+        self.apply_changes(removed=[entry_id])
+
+    def mark_fetched(self, characters, fetched_at=None, last_active=None):
+        """記錄角色最後一次成功查詢的時間；last_active 為與 characters 對應的最近出場時間（可為 None）"""
+        fetched_at = fetched_at or time.time()
+        last_active = last_active or [None] * len(characters)
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE characters SET last_fetched = ?, last_active = COALESCE(MAX(last_active, ?), ?, last_active) "
+                "WHERE region = ? AND realm = ? AND name = ?",
+                [(fetched_at, active, active, region, realm, name)
+                 for (region, realm, name), active in zip(characters, last_active)])
+            self._conn.commit()
+
+    def migrate_from_file(self, filepath):
+        """只執行一次：將舊版 characters.txt 的名單匯入資料庫（保留原檔案）"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= 1:
+            return 0
+        added = 0
+        if os.path.exists(filepath):
+            added = self.add_many(read_characters_file(filepath))
+        with self._lock:
+            self._conn.execute("PRAGMA user_version = 1")
+            self._conn.commit()
+        return added
+
+_roster_store = None
+_roster_store_lock = threading.Lock()
+
+def get_roster_store():
+    """取得共用的角色名單資料庫，第一次開啟時自動匯入 characters.txt；無法建立時回傳 None"""
+    global _roster_store
+    if _roster_store is None:
+        with _roster_store_lock:
+            if _roster_store is None:
+                try:
+                    store = RosterStore(os.path.join(get_data_dir(), "roster.sqlite3"))
+                    store.migrate_from_file(get_characters_file_path())
+                    _roster_store = store
+                except Exception as e:
+                    print(f"無法開啟角色名單資料庫: {str(e)}")
+                    return None
+    return _roster_store
+
+def load_roster(group=None):
+    """讀取角色名單，資料庫無法使用時改為讀取 characters.txt"""
+    store = get_roster_store()
+    if store is None:
+        return read_characters_file()
+    return store.characters(group)
+
+# 歷史快照的壓縮等級（zlib）
+SNAPSHOT_COMPRESS_LEVEL = 6
+
+def profile_snapshot(profile):
+    """將角色資料精簡為快照內容：職業、總分與各副本最佳紀錄（最近紀錄不列入，避免頻繁變動）；
+    沒有載入最佳紀錄時 best_runs 為 None，由 SnapshotStore.record_many 沿用上一筆快照的內容"""
+    return {
+        "class": profile.class_name,
+        "score": profile.score,
+        "best_runs": None if "best" not in profile.tiers else {
+            summary.name: [run.mythic_level, run.score, run.keystone_upgrades, run.clear_time_ms,
+                           run.completed_at.isoformat() if run.completed_at else None]
+            for summary in profile.dungeons.values()
+            for run in (summary.best_run,)
+        },
+    }
+
+class SnapshotStore:
+    """以 SQLite 儲存每次查詢結果的歷史快照；內容以 zlib 壓縮並依雜湊值去重，
+    與該角色上一筆快照相同時只更新最後查詢時間，不新增紀錄"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS characters (
+                id INTEGER PRIMARY KEY,
+                region TEXT NOT NULL COLLATE NOCASE,
+                realm TEXT NOT NULL COLLATE NOCASE,
+                name TEXT NOT NULL COLLATE NOCASE,
+                last_hash TEXT,
+                last_score REAL,
+                last_seen REAL,
+                UNIQUE (region, realm, name)
+            );
+            CREATE TABLE IF NOT EXISTS payloads (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                character_id INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                score REAL,
+                hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_snapshots_character ON snapshots (character_id, fetched_at);
+        """)
+        self._conn.commit()
+
+    def record_many(self, profiles, fetched_at=None):
+        """寫入查詢結果（略過查詢失敗的角色），回傳分數與上一次不同的角色 {(region, realm, name), ...}。
+        只有摘要（沒有最佳紀錄）的結果在分數未變動時只更新最後查詢時間，分數變動時沿用上一筆快照的最佳紀錄，
+        避免摘要與完整資料交替查詢時每次都新增快照，或比較快照時誤判所有紀錄都已移除"""
+        import hashlib
+        import zlib
+
+        fetched_at = fetched_at or time.time()
+        changed = set()
+        with self._lock:
+            with self._conn:
+                for profile in profiles:
+                    if profile.error is not None:
+                        continue
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO characters (region, realm, name) VALUES (?, ?, ?)",
+                        (profile.region, profile.realm, profile.name))
+                    character_id, last_hash, last_score = self._conn.execute(
+                        "SELECT id, last_hash, last_score FROM characters WHERE region = ? AND realm = ? AND name = ?",
+                        (profile.region, profile.realm, profile.name)).fetchone()
+                    if last_hash is not None and last_score != profile.score:
+                        changed.add((profile.region, profile.realm, profile.name))
+                    if "best" not in profile.tiers and last_hash is not None and last_score == profile.score:
+                        self._conn.execute("UPDATE characters SET last_seen = ? WHERE id = ?", (fetched_at, character_id))
+                        continue
+                    snapshot = profile_snapshot(profile)
+                    if snapshot["best_runs"] is None and last_hash is not None:
+                        row = self._conn.execute("SELECT data FROM payloads WHERE hash = ?", (last_hash,)).fetchone()
+                        snapshot["best_runs"] = json.loads(zlib.decompress(row[0]))["best_runs"] if row else None
+                    payload = json.dumps(snapshot, sort_keys=True, separators=(",", ":")).encode("utf-8")
+                    digest = hashlib.sha1(payload).hexdigest()
+                    if digest != last_hash:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO payloads (hash, data) VALUES (?, ?)",
+                            (digest, zlib.compress(payload, SNAPSHOT_COMPRESS_LEVEL)))
+                        self._conn.execute(
+                            "INSERT INTO snapshots (character_id, fetched_at, score, hash) VALUES (?, ?, ?, ?)",
+                            (character_id, fetched_at, profile.score, digest))
+                    self._conn.execute(
+                        "UPDATE characters SET last_hash = ?, last_score = ?, last_seen = ? WHERE id = ?",
+                        (digest, profile.score, fetched_at, character_id))
+        return changed
+
+    def score_history(self, region, realm, name, since=None, until=None):
+        """回傳角色在時間範圍內的 [(時間戳, 分數), ...]；範圍開始時仍有效的上一筆快照也會包含在內"""
+        since = since if since is not None else 0
+        until = until if until is not None else float("inf")
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM characters WHERE region = ? AND realm = ? AND name = ?",
+                (region, realm, name)).fetchone()
+            if row is None:
+                return []
+            previous = self._conn.execute(
+                "SELECT fetched_at, score FROM snapshots WHERE character_id = ? AND fetched_at < ? "
+                "ORDER BY fetched_at DESC LIMIT 1", (row[0], since)).fetchall()
+            rows = self._conn.execute(
+                "SELECT fetched_at, score FROM snapshots WHERE character_id = ? AND fetched_at >= ? AND fetched_at <= ? "
+                "ORDER BY fetched_at", (row[0], since, until)).fetchall()
+        return previous + rows
+
+    def snapshot_at(self, region, realm, name, at=None):
+        """回傳角色在指定時間點的快照內容（見 profile_snapshot），沒有資料時回傳 None"""
+        import zlib
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT p.data FROM characters c "
+                "JOIN snapshots s ON s.character_id = c.id JOIN payloads p ON p.hash = s.hash "
+                "WHERE c.region = ? AND c.realm = ? AND c.name = ? AND s.fetched_at <= ? "
+                "ORDER BY s.fetched_at DESC LIMIT 1",
+                (region, realm, name, at if at is not None else float("inf"))).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def roster_deltas(self, since):
+        """回傳自 since 以來分數有變動的角色 [(region, realm, name, 當時分數, 目前分數), ...]，依變動幅度排序；
+        since 之前沒有快照的角色以 since 之後的第一筆快照為基準"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT c.region, c.realm, c.name,
+                       COALESCE(
+                           (SELECT score FROM snapshots WHERE character_id = c.id AND fetched_at <= ?
+                            ORDER BY fetched_at DESC LIMIT 1),
+                           (SELECT score FROM snapshots WHERE character_id = c.id AND fetched_at > ?
+                            ORDER BY fetched_at LIMIT 1)),
+                       c.last_score
+                FROM characters c
+            """, (since, since)).fetchall()
+        deltas = [row for row in rows if row[3] is not None and row[4] is not None and row[3] != row[4]]
+        deltas.sort(key=lambda row: row[4] - row[3], reverse=True)
+        return deltas
+
+_snapshot_store = None
+_snapshot_store_lock = threading.Lock()
+
+def get_snapshot_store():
+    """取得共用的歷史快照資料庫，無法建立時回傳 None（不記錄歷史）"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        with _snapshot_store_lock:
+            if _snapshot_store is None:
+                try:
+                    _snapshot_store = SnapshotStore(os.path.join(get_data_dir(), "history.sqlite3"))
+                except Exception as e:
+                    print(f"無法開啟歷史資料庫: {str(e)}")
+                    return None
+    return _snapshot_store
+
+def profile_last_active(profile):
+    """最近紀錄中最新一筆的完成時間（Unix 時間），沒有最近紀錄時回傳 None"""
+    latest = max((run.completed_at for summary in profile.dungeons.values()
+                  for run in summary.recent_runs if run.completed_at), default=None)
+    return latest.replace(tzinfo=timezone.utc).timestamp() if latest else None
+
+def record_fetch_results(profiles):
+    """將成功的查詢結果寫入歷史快照、角色名單的最後查詢時間與最近出場時間；
+    沒有載入最近紀錄的角色以分數變動作為出場的依據（出場時間記為這次查詢的時間）"""
+    profiles = [profile for profile in profiles if profile.error is None]
+    if not profiles:
+        return
+    fetched_at = time.time()
+    snapshot_store = get_snapshot_store()
+    changed = snapshot_store.record_many(profiles, fetched_at) if snapshot_store else set()
+    roster_store = get_roster_store()
+    if roster_store:
+        keys = [(p.region, p.realm, p.name) for p in profiles]
+        roster_store.mark_fetched(keys, fetched_at, [
+            profile_last_active(p) if "recent" in p.tiers else (fetched_at if key in changed else None)
+            for p, key in zip(profiles, keys)])
+
+# 背景自動更新的週期（秒）：最活躍的角色在這段時間內更新一次；0 表示停用
+AUTO_REFRESH_INTERVAL = float(os.environ.get("RAIDERIO_AUTO_REFRESH_INTERVAL", 15 * 60))
+
+# 依最近出場距今的時間拉長更新週期：(距今秒數上限, 週期倍數)，超過最後一項時使用 INACTIVE_REFRESH_FACTOR
+ACTIVITY_REFRESH_FACTORS = ((86400, 1), (7 * 86400, 2), (30 * 86400, 4))
+INACTIVE_REFRESH_FACTOR = 8
+
+def refresh_interval(entry, interval=AUTO_REFRESH_INTERVAL, now=None):
+    """角色的更新週期：越久沒有出場的角色越少更新，尚無出場紀錄時視為不活躍"""
+    if entry.last_active is None:
+        return interval * INACTIVE_REFRESH_FACTOR
+    idle = (now or time.time()) - entry.last_active
+    for limit, factor in ACTIVITY_REFRESH_FACTORS:
+        if idle <= limit:
+            return interval * factor
+    return interval * INACTIVE_REFRESH_FACTOR
+
+def due_for_refresh(entries, interval=AUTO_REFRESH_INTERVAL, now=None, limit=None, attempted=None):
+    """回傳已到更新時間的角色 [(region, realm, name), ...]，依逾期比例（距上次查詢的時間 / 更新週期）
+    由高到低排列，同比例時較活躍的角色優先；從未查詢過的角色排在最前面。
+    attempted 為 {key: 上次嘗試查詢的時間}，避免查詢失敗的角色在每次排程都被重新查詢"""
+    now = now or time.time()
+    attempted = attempted or {}
+    ranked = []
+    for order, entry in enumerate(entries):
+        last = max(entry.last_fetched or 0, attempted.get(entry.key, 0))
+        overdue = (now - last) / refresh_interval(entry, interval, now) if last else float("inf")
+        if overdue >= 1:
+            ranked.append((-overdue, -(entry.last_active or 0), order, entry.key))
+    ranked.sort()
+    return [key for *_, key in ranked[:limit]]
+
+# 名單的排序方式：名單順序、總分（高到低）、名稱、伺服器、層數（高到低）
+ROSTER_SORTS = ("roster", "score", "name", "realm", "level")
+
+@dataclass(frozen=True, slots=True)
+class RosterFilter:
+    """名單的搜尋、篩選與排序條件；None 或空字串表示不限。
+    dungeon 為層數條件與層數排序依據的副本，None 表示任一副本（各副本中的最高層數）"""
+    text: str = ""
+    class_name: str = None
+    min_score: float = None
+    max_score: float = None
+    dungeon: str = None
+    min_level: int = None
+    sort: str = "roster"
+
+    @property
+    def active(self):
+        """是否有任何篩選條件（不含排序）"""
+        return bool(self.text.strip()) or any(
+            value is not None for value in (self.class_name, self.min_score, self.max_score, self.min_level))
+
+    @property
+    def needs_best(self):
+        """條件是否需要各副本的最佳紀錄（層數篩選或排序）"""
+        return self.min_level is not None or self.sort == "level"
+
+def _discard_sorted(items, item):
+    index = bisect_left(items, item)
+    if index < len(items) and items[index] == item:
+        del items[index]
+
+class RosterIndex:
+    """顯示中名單的記憶體索引：搜尋字串、職業、總分與各副本最高層數。
+    篩選只查詢索引（分數與層數為排序後的列表，以二分搜尋取範圍），排序結果在資料變動前重複使用，
+    每次輸入都不需要走訪介面元件或重新解析資料"""
+
+    def __init__(self):
+        self._positions = {}  # key -> 名單順序
+        self._text = {}       # key -> 小寫的 "名稱 地區-伺服器"
+        self._profiles = {}   # key -> CharacterProfile
+        self._classes = {}    # 職業 -> {key}
+        self._scores = []     # 依分數排序的 [(score, key)]
+        self._levels = {}     # 副本名稱（None 表示任一副本）-> 依層數排序的 [(level, key)]
+        self._orders = {}     # (排序方式, 副本) -> 排序後的 key 列表，資料變動時清除
+
+    def set_characters(self, characters):
+        """設定目前的名單；已不在名單中的角色一併移除其資料"""
+        self._positions = {key: position for position, key in enumerate(characters)}
+        self._text = {key: f"{key[2]} {key[0]}-{key[1]}".casefold() for key in characters}
+        for key in [key for key in self._profiles if key not in self._positions]:
+            self._remove(key)
+        self._orders.clear()
+
+    def profile(self, key):
+        return self._profiles.get(key)
+
+    def update(self, key, profile):
+        """以查詢結果更新角色的索引；沒有最佳紀錄的資料不列入層數索引"""
+        if key not in self._positions:
+            return
+        self._remove(key)
+        self._profiles[key] = profile
+        self._classes.setdefault(profile.class_name, set()).add(key)
+        if profile.score is not None:
+            insort(self._scores, (profile.score, key))
+        if "best" in profile.tiers and profile.dungeons:
+            for name, summary in profile.dungeons.items():
+                insort(self._levels.setdefault(name, []), (summary.best_run.mythic_level, key))
+            insort(self._levels.setdefault(None, []), (self._max_level(profile), key))
+        self._orders.clear()
+
+    def _remove(self, key):
+        profile = self._profiles.pop(key, None)
+        if profile is None:
+            return
+        self._classes.get(profile.class_name, set()).discard(key)
+        if profile.score is not None:
+            _discard_sorted(self._scores, (profile.score, key))
+        if "best" in profile.tiers and profile.dungeons:
+            for name, summary in profile.dungeons.items():
+                _discard_sorted(self._levels.get(name, []), (summary.best_run.mythic_level, key))
+            _discard_sorted(self._levels.get(None, []), (self._max_level(profile), key))
+
+    @staticmethod
+    def _max_level(profile):
+        return max(summary.best_run.mythic_level for summary in profile.dungeons.values())
+
+    def _level(self, key, dungeon):
+        profile = self._profiles.get(key)
+        if profile is None or "best" not in profile.tiers or not profile.dungeons:
+            return None
+        if dungeon is None:
+            return self._max_level(profile)
+        summary = profile.dungeons.get(dungeon)
+        return summary.best_run.mythic_level if summary else None
+
+    def matches(self, criteria, keys=None):
+        """回傳符合條件的角色 {key}；keys 限定只檢查這些角色。尚未查詢完成的角色只比對名稱與伺服器"""
+        pool = set(self._positions) if keys is None else {key for key in keys if key in self._positions}
+        if criteria.class_name:
+            pool &= self._classes.get(criteria.class_name, set())
+        if criteria.min_score is not None or criteria.max_score is not None:
+            scores = self._scores
+            low = bisect_left(scores, criteria.min_score, key=itemgetter(0)) if criteria.min_score is not None else 0
+            high = (bisect_right(scores, criteria.max_score, key=itemgetter(0))
+                    if criteria.max_score is not None else len(scores))
+            pool &= {key for _, key in scores[low:high]}
+        if criteria.min_level is not None:
+            levels = self._levels.get(criteria.dungeon, [])
+            pool &= {key for _, key in levels[bisect_left(levels, criteria.min_level, key=itemgetter(0)):]}
+        text = criteria.text.strip().casefold()
+        if text:
+            pool = {key for key in pool if text in self._text[key]}
+        return pool
+
+    def order(self, sort="roster", dungeon=None):
+        """回傳依 sort 排序的整份名單；沒有分數或層數的角色排在最後，同值時依名單順序"""
+        cache_key = (sort, dungeon if sort == "level" else None)
+        order = self._orders.get(cache_key)
+        if order is not None:
+            return order
+        positions = self._positions
+        if sort == "score":
+            def rank(key):
+                profile = self._profiles.get(key)
+                score = profile.score if profile is not None else None
+                return (score is None, -(score or 0), positions[key])
+        elif sort == "name":
+            def rank(key):
+                return (key[2].casefold(), positions[key])
+        elif sort == "realm":
+            def rank(key):
+                return (key[0].casefold(), key[1].casefold(), key[2].casefold())
+        elif sort == "level":
+            def rank(key):
+                level = self._level(key, dungeon)
+                return (level is None, -(level or 0), positions[key])
+        else:
+            rank = positions.__getitem__
+        order = self._orders[cache_key] = sorted(positions, key=rank)
+        return order
+
+# 公會成員名單的快取有效時間（秒）
+GUILD_CACHE_TTL = 600
+
+@dataclass(frozen=True, slots=True)
+class GuildMember:
+    region: str
+    realm: str
+    name: str
+    rank: int
+    level: int = None
+    class_name: str = "Unknown"
+
+    @property
+    def key(self):
+        return (self.region, self.realm, self.name)
+
+def fetch_guild_members(region, realm, guild_name):
+    """以一次請求取得公會成員名單，回傳 GuildMember 列表；失敗時拋出例外"""
+    params = {"region": region, "realm": realm, "name": guild_name, "fields": "members"}
+    cache_key = "guild:" + "|".join([region.lower(), realm.lower(), guild_name.lower(), params["fields"]])
+    data = fetch_json_cached(f"{RAIDERIO_API_BASE}/guilds/profile", params, cache_key, GUILD_CACHE_TTL)
+    members = []
+    for member in data.get("members", []):
+        character = member.get("character", {})
+        if not character.get("name"):
+            continue
+        members.append(GuildMember(
+            region=character.get("region") or region,
+            realm=character.get("realm") or realm,
+            name=character["name"],
+            rank=member.get("rank", 0),
+            level=character.get("level"),
+            class_name=character.get("class", "Unknown"),
+        ))
+    return members
+
+def import_guild(region, realm, guild_name, min_level=None, max_rank=None, group=None):
+    """匯入公會成員到角色名單：只加入符合等級與階級條件的成員（階級數字越小越高），
+    並標記已離開公會的角色。回傳 (新增數量, 標記離開數量)"""
+    store = get_roster_store()
+    if store is None:
+        raise RuntimeError("無法開啟角色名單資料庫")
+    members = fetch_guild_members(region, realm, guild_name)
+    selected = [member.key for member in members
+                if (min_level is None or member.level is None or member.level >= min_level)
+                and (max_rank is None or member.rank <= max_rank)]
+    guild = f"{region}/{realm}/{guild_name}"
+    return store.sync_guild(guild, [member.key for member in members], selected,
+                            group=guild_name if group is None else group)
+
+def profile_cache_key(region, realm, name, fields):
+    # 快取鍵包含 fields，各層（以及合併查詢的欄位組合）的回應分開儲存
+    return "profile:" + "|".join([region.lower(), realm.lower(), name.lower(), fields])
+
+def split_profile_tiers(data, tiers):
+    """將合併查詢的回應拆成各層的 JSON：每一層保留基本資料與該層的欄位"""
+    tier_keys = {key for _, key in PROFILE_TIERS.values()}
+    base = {key: value for key, value in data.items() if key not in tier_keys}
+    return {tier: dict(base, **{PROFILE_TIERS[tier][1]: data.get(PROFILE_TIERS[tier][1], [])}) for tier in tiers}
+
+def fetch_character_data(region, realm, character_name, token=None, tiers=ALL_PROFILE_TIERS):
+    """查詢角色的原始 JSON（只包含 tiers 各層的欄位），失敗（包含逾時與取消）時回傳 {"error": 訊息}。
+    有效期內的層直接使用快取，其餘的層合併成一次條件式請求：合併的回應以其欄位組合另外快取（保留 ETag），
+    再拆開存入各層的快取。拆開的部分沿用該層原有的 ETag 與 Last-Modified：伺服器資料若仍符合舊的 ETag，
+    其內容即與拆開的部分相同，之後單獨查詢該層時仍可取得 304"""
+    base_url = f"{RAIDERIO_API_BASE}/characters/profile"
+    params = {
+        "region": region,
+        "realm": realm,
+        "name": character_name,
+    }
+    cache = get_response_cache()
+    data = {}
+    missing = []
+    validators = {}  # 過期的層 -> 原有的 ETag 與 Last-Modified
+    try:
+        for tier in normalize_tiers(tiers):
+            cached = cache.get(profile_cache_key(region, realm, character_name, PROFILE_TIERS[tier][0])) if cache else None
+            if cached and time.time() - cached[2] < PROFILE_CACHE_TTL:
+                metrics.count("response_cache.fresh")
+                data.update(json.loads(cached[0]))
+            else:
+                missing.append(tier)
+                if cached:
+                    validators[tier] = {name: cached[1][name] for name in ("etag", "last_modified") if cached[1].get(name)}
+        if len(missing) == 1:
+            data.update(fetch_json_cached(base_url, dict(params, fields=PROFILE_TIERS[missing[0]][0]),
+                                          profile_cache_key(region, realm, character_name, PROFILE_TIERS[missing[0]][0]),
+                                          PROFILE_CACHE_TTL, token=token, budget=CHARACTER_TIMEOUT))
+        elif missing:
+            fields = ",".join(PROFILE_TIERS[tier][0] for tier in missing)
+            combined = fetch_json_cached(base_url, dict(params, fields=fields),
+                                         profile_cache_key(region, realm, character_name, fields),
+                                         PROFILE_CACHE_TTL, token=token, budget=CHARACTER_TIMEOUT)
+            if cache:
+                for tier, part in split_profile_tiers(combined, missing).items():
+                    cache.put(profile_cache_key(region, realm, character_name, PROFILE_TIERS[tier][0]),
+                              json.dumps(part, ensure_ascii=False).encode("utf-8"), validators.get(tier))
+            data.update(combined)
+        return data
+    except Exception as e:
+        return {"error": str(e)}
+
+def fetch_character_profile(region, realm, name, token=None, tiers=ALL_PROFILE_TIERS):
+    """查詢並解析單一角色的 tiers 各層，任何錯誤都會轉為帶有 error 的 CharacterProfile"""
+    tiers = normalize_tiers(tiers)
+    try:
+        data = fetch_character_data(region, realm, name, token, tiers)
+        with metrics.timer("parse", "character_profile"):
+            return parse_character_profile(region, realm, name, data, tiers)
+    except Exception as e:
+        return CharacterProfile(region, realm, name, error=f"資料格式錯誤: {str(e)}")
+
+def fetch_roster(characters, max_workers=MAX_CONCURRENT_REQUESTS, token=None, tiers=None):
+    """以執行緒池平行查詢整份名單，依完成順序逐一產生 (名單索引, CharacterProfile)；
+    tiers 為各角色要查詢的資料層（與 characters 對應），None 表示全部。
+    每個角色最多花費 CHARACTER_TIMEOUT 秒。token 被取消時立即停止，放棄尚未開始的查詢；
+    超過 token 的整體時限時，尚未完成的角色以逾時錯誤產生"""
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = {executor.submit(fetch_character_profile, *char, token,
+                                   tiers[idx] if tiers is not None else ALL_PROFILE_TIERS): idx
+                   for idx, char in enumerate(characters)}
+        pending = set(futures)
+        while pending:
+            # 有 token 時定期醒來檢查取消與時限，不必等到下一個角色完成
+            done, pending = wait(pending, timeout=0.1 if token is not None else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures[future], future.result()
+            if token is None or not pending:
+                continue
+            if token.cancelled:
+                return
+            if token.expired:
+                for future in pending:
+                    region, realm, name = characters[futures[future]]
+                    yield futures[future], CharacterProfile(region, realm, name, error="已超過更新時限")
+                return
+    finally:
+        # 不等待進行中的請求；它們會在 token 取消後的下一次檢查結束
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# CSV 輸出的欄位（每個副本一列，沒有紀錄的角色輸出一列空白副本）
+CSV_COLUMNS = ["region", "realm", "name", "class", "score", "dungeon", "mythic_level",
+               "dungeon_score", "keystone_upgrades", "clear_time", "completed_at", "error"]
+
+def run_to_dict(run):
+    return {
+        "dungeon": run.dungeon,
+        "mythic_level": run.mythic_level,
+        "score": run.score,
+        "keystone_upgrades": run.keystone_upgrades,
+        "clear_time_ms": run.clear_time_ms,
+        "clear_time": run.time_text,
+        "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+    }
+
+def profile_to_dict(profile):
+    """轉為可輸出成 JSON 的 dict"""
+    return {
+        "region": profile.region,
+        "realm": profile.realm,
+        "name": profile.name,
+        "class": profile.class_name,
+        "score": profile.score,
+        "thumbnail_url": profile.thumbnail_url,
+        "dungeons": [
+            {
+                "name": summary.name,
+                "display_name": summary.display_name,
+                "best_run": run_to_dict(summary.best_run),
+                "recent_runs": [run_to_dict(run) for run in summary.recent_runs],
+            }
+            for summary in profile.dungeons.values()
+        ],
+        "error": profile.error,
+    }
+
+def profile_to_rows(profile):
+    base = {"region": profile.region, "realm": profile.realm, "name": profile.name,
+            "class": profile.class_name, "score": profile.score, "error": profile.error or ""}
+    if not profile.dungeons:
+        return [base]
+    rows = []
+    for summary in profile.dungeons.values():
+        run = summary.best_run
+        rows.append(dict(base, dungeon=summary.name, mythic_level=run.mythic_level,
+                         dungeon_score=run.score, keystone_upgrades=run.keystone_upgrades,
+                         clear_time=run.time_text, completed_at=run.date_text))
+    return rows
+
+def main(argv=None):
+    import argparse
+    import csv
+
+    parser = argparse.ArgumentParser(description="查詢角色名單的 Raider.IO 傳奇鑰石資料（不需要圖形介面）")
+    parser.add_argument("--file", help="改用文字格式的角色名單檔案（地區,伺服器,角色名稱），預設使用角色名單資料庫")
+    parser.add_argument("--group", help="只查詢某個群組的角色")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="輸出格式")
+    parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_REQUESTS, help="同時查詢的角色數量")
+    parser.add_argument("--output", help="輸出檔案，預設為標準輸出")
+    parser.add_argument("--tiers", default=",".join(ALL_PROFILE_TIERS),
+                        help="查詢的資料層，以逗號分隔（summary 總分、best 最佳紀錄、recent 最近紀錄）；"
+                             "只需要總分時使用 summary 可減少傳輸量")
+    parser.add_argument("--metrics", metavar="檔案", help="記錄效能統計，結束時以 JSON lines 寫入此檔案")
+    parser.add_argument("--deltas-since", metavar="YYYY-MM-DD",
+                        help="不查詢，改為輸出歷史紀錄中自該日期以來分數有變動的角色")
+    parser.add_argument("--import-guild", metavar="地區/伺服器/公會名稱",
+                        help="不查詢角色，改為將公會成員匯入角色名單並標記已離開的成員")
+    parser.add_argument("--min-level", type=int, help="公會匯入時只加入此等級以上的角色")
+    parser.add_argument("--max-rank", type=int, help="公會匯入時只加入此階級以上的角色（會長為 0）")
+    args = parser.parse_args(argv)
+
+    if args.deltas_since:
+        return print_deltas(args.deltas_since, args.format, args.output)
+    if args.import_guild:
+        parts = args.import_guild.split("/", 2)
+        if len(parts) != 3 or not all(parts):
+            print("公會格式錯誤，應為 地區/伺服器/公會名稱", file=sys.stderr)
+            return 2
+        try:
+            added, departed = import_guild(*parts, min_level=args.min_level, max_rank=args.max_rank)
+        except Exception as e:
+            print(f"無法匯入公會: {str(e)}", file=sys.stderr)
+            return 1
+        print(f"新增 {added} 名角色，{departed} 名角色已離開公會")
+        return 0
+
+    if args.metrics:
+        metrics.enabled = True
+    tiers = [tier.strip() for tier in args.tiers.split(",") if tier.strip()]
+    unknown = [tier for tier in tiers if tier not in PROFILE_TIERS]
+    if unknown:
+        print(f"未知的資料層: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    tiers = normalize_tiers(tiers)
+
+    try:
+        if args.file:
+            characters = list(dict.fromkeys(read_characters_file(args.file)))
+        else:
+            characters = load_roster(args.group)
+    except OSError as e:
+        print(f"無法讀取角色檔案: {str(e)}", file=sys.stderr)
+        return 2
+
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS, lineterminator="\n")
+            writer.writeheader()
+        # 依名單順序輸出；先完成的結果暫存，等前面的角色完成後再一起寫出
+        pending = {}
+        next_idx = 0
+        failed = 0
+        profiles = []
+        for idx, profile in fetch_roster(characters, args.workers, tiers=[tiers] * len(characters)):
+            pending[idx] = profile
+            profiles.append(profile)
+            failed += profile.error is not None
+            while next_idx in pending:
+                profile = pending.pop(next_idx)
+                if args.format == "csv":
+                    writer.writerows(profile_to_rows(profile))
+                else:
+                    output.write(json.dumps(profile_to_dict(profile), ensure_ascii=False) + "\n")
+                output.flush()
+                next_idx += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    record_fetch_results(profiles)
+    if args.metrics:
+        metrics.export_jsonl(args.metrics)
+        print(metrics.format_summary(), file=sys.stderr)
+    return 1 if failed else 0
+
+def print_deltas(since_text, output_format, output_path=None):
+    import csv
+
+    try:
+        since = datetime.strptime(since_text, "%Y-%m-%d").timestamp()
+    except ValueError:
+        print(f"日期格式錯誤: {since_text}", file=sys.stderr)
+        return 2
+    store = get_snapshot_store()
+    if store is None:
+        return 2
+
+    output = open(output_path, "w", encoding="utf-8", newline="") if output_path else sys.stdout
+    try:
+        columns = ["region", "realm", "name", "score_then", "score_now", "delta"]
+        rows = [dict(zip(columns, (*row, row[4] - row[3]))) for row in store.roster_deltas(since)]
+        if output_format == "csv":
+            writer = csv.DictWriter(output, fieldnames=columns, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                output.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
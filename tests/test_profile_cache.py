@@ -0,0 +1,66 @@
+"""以本機測試伺服器（tools/mock_raiderio.py）驗證角色資料的分層快取與條件式請求"""
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "tools"))
+
+import raiderio_core
+from mock_raiderio import start_in_thread
+
+CHARACTERS = [("tw", "mock", f"c{index}") for index in range(3)]
+
+class ProfileRevalidationTest(unittest.TestCase):
+    def setUp(self):
+        self.server, self.mock = start_in_thread()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.saved = (raiderio_core.RAIDERIO_API_BASE, raiderio_core.PROFILE_CACHE_TTL, raiderio_core._response_cache)
+        raiderio_core.RAIDERIO_API_BASE = f"{self.mock.base_url}/api/v1"
+        raiderio_core.PROFILE_CACHE_TTL = 0  # 每次都視為過期，必須以條件式請求重新驗證
+        raiderio_core._response_cache = raiderio_core.DiskCache(
+            os.path.join(self.temp_dir.name, "responses.sqlite3"), raiderio_core.RESPONSE_CACHE_MAX_BYTES)
+
+    def tearDown(self):
+        raiderio_core.RAIDERIO_API_BASE, raiderio_core.PROFILE_CACHE_TTL, raiderio_core._response_cache = self.saved
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def fetch(self, tiers):
+        self.mock.reset()
+        profiles = [raiderio_core.fetch_character_profile(*character, tiers=tiers) for character in CHARACTERS]
+        for profile in profiles:
+            self.assertIsNone(profile.error)
+        return profiles, self.mock.stats()
+
+    def test_single_tier_revalidates(self):
+        first, _ = self.fetch(("summary",))
+        second, stats = self.fetch(("summary",))
+        self.assertEqual(stats["by_route"]["profile"], len(CHARACTERS))
+        self.assertEqual(stats["bytes"], 0)  # 全部為 304
+        self.assertEqual(first, second)
+
+    def test_combined_tiers_revalidate(self):
+        first, stats = self.fetch(raiderio_core.ALL_PROFILE_TIERS)
+        self.assertEqual(stats["by_route"]["profile"], len(CHARACTERS))  # 多層合併為一次請求
+        self.assertGreater(stats["bytes"], 0)
+        second, stats = self.fetch(raiderio_core.ALL_PROFILE_TIERS)
+        self.assertEqual(stats["by_route"]["profile"], len(CHARACTERS))
+        self.assertEqual(stats["bytes"], 0)  # 全部為 304
+        self.assertEqual(first, second)
+
+    def test_combined_fetch_keeps_tier_validators(self):
+        self.fetch(("summary",))
+        first, stats = self.fetch(("summary",))
+        self.assertEqual(stats["bytes"], 0)
+        self.fetch(raiderio_core.ALL_PROFILE_TIERS)  # 拆開存入各層快取時不可覆蓋摘要層的 ETag
+        second, stats = self.fetch(("summary",))
+        self.assertEqual(stats["by_route"]["profile"], len(CHARACTERS))
+        self.assertEqual(stats["bytes"], 0)  # 全部為 304
+        self.assertEqual(first, second)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""驗證歷史快照在摘要與完整資料交替查詢時的內容"""
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import raiderio_core
+from raiderio_core import CharacterProfile, DungeonSummary, RunRecord
+
+def make_profile(score, tiers=raiderio_core.ALL_PROFILE_TIERS):
+    dungeons = {}
+    if "best" in tiers:
+        dungeons = {name: DungeonSummary(name, name, RunRecord(name, level, score=level * 10.0, clear_time_ms=1800000))
+                    for name, level in (("ARAK", 10), ("DAWN", 12))}
+    return CharacterProfile("tw", "mock", "c0", class_name="Mage", score=score, dungeons=dungeons, tiers=tiers)
+
+class SnapshotStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = raiderio_core.SnapshotStore(os.path.join(self.temp_dir.name, "history.sqlite3"))
+
+    def tearDown(self):
+        self.store._conn.close()
+        self.temp_dir.cleanup()
+
+    def test_summary_snapshot_keeps_best_runs(self):
+        self.store.record_many([make_profile(2000.0)], fetched_at=100)
+        full = self.store.snapshot_at("tw", "mock", "c0")
+        changed = self.store.record_many([make_profile(2050.0, ("summary",))], fetched_at=200)
+        self.assertEqual(changed, {("tw", "mock", "c0")})
+        summary = self.store.snapshot_at("tw", "mock", "c0")
+        self.assertEqual(summary["score"], 2050.0)
+        self.assertEqual(summary["best_runs"], full["best_runs"])  # 沿用上一筆快照，不會被視為紀錄已移除
+        self.assertEqual(self.store.snapshot_at("tw", "mock", "c0", at=150), full)
+
+    def test_unchanged_summary_adds_no_snapshot(self):
+        self.store.record_many([make_profile(2000.0)], fetched_at=100)
+        self.store.record_many([make_profile(2000.0, ("summary",))], fetched_at=200)
+        self.assertEqual(self.store.score_history("tw", "mock", "c0"), [(100, 2000.0)])
+
+if __name__ == "__main__":
+    unittest.main()
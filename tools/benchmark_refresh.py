@@ -0,0 +1,171 @@
+"""更新流程的端對端效能測試：啟動本機測試伺服器，在 offscreen 模式下以 DataFetcher 與
+display_character / display_data 完成更新，回報首張卡片時間、總更新時間、請求數量、傳輸量與記憶體峰值
+
+用法：
+    python tools/benchmark_refresh.py --sizes 10 100 1000 --latency 80 --jitter 40
+    python tools/benchmark_refresh.py --mode batch --engine view --json results.jsonl
+
+每個名單大小在獨立的子行程與空白的資料夾中執行（冷快取），記憶體峰值不互相影響；
+同一個子行程接著再更新一次，量測快取命中時的表現（warm）。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+
+def peak_rss_mb():
+    """目前行程的記憶體峰值（MB），平台不支援時回傳 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def server_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/__stats") as response:
+        return json.loads(response.read())
+
+def run_child(args):
+    """子行程：建立主視窗，把名單換成 args.child 個角色後量測更新"""
+    home = tempfile.mkdtemp(prefix="raiderio-bench-")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+    os.environ["RAIDERIO_API_BASE"] = f"{args.base}/api/v1"
+    os.environ["RAIDERIO_ICON_BASE"] = f"{args.base}/icons"
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, REPO_DIR)
+
+    import raiderio_core
+    raiderio_core.DEFAULT_REQUESTS_PER_SECOND = raiderio_core.RAIDERIO_REQUESTS_PER_SECOND = args.rate
+    import main
+    main.STREAM_RESULTS = args.mode == "stream"
+    main.RENDER_ENGINE = args.engine
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication([])
+    window = main.RaiderIOMainWindow()  # 名單為空，不會發出角色查詢
+    window.show()
+
+    def pump(condition, timeout):
+        deadline = time.perf_counter() + timeout
+        while not condition() and time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+
+    # 等待首次繪製後的延遲載入（詞綴）完成，避免計入更新時間
+    pump(lambda: hasattr(window, "affix_fetcher") and window.affix_fetcher.isFinished(), 5)
+    raiderio_core.get_roster_store().add_many(
+        [("tw", "mock", f"c{index}") for index in range(args.child)])
+
+    def image_loader_idle():
+        loader = window.image_loader
+        return not loader._queue and not loader._running
+
+    def refresh(label):
+        stats_before = server_stats(args.base)
+        marks = {}
+        start = time.perf_counter()
+        window.update_data()
+
+        # 在顯示卡片的 slot 之後才連接，記錄到的是卡片已建立（或模型已更新）的時間
+        def first_card(*_):
+            marks.setdefault("first_card", time.perf_counter())
+
+        if args.mode == "stream":
+            window.fetcher.character_fetched.connect(first_card)
+        else:
+            window.fetcher.data_fetched.connect(first_card)
+        window.fetcher.finished.connect(lambda: marks.setdefault("done", time.perf_counter()))
+        pump(lambda: "done" in marks, args.timeout)
+        app.processEvents()
+        done = time.perf_counter()
+        pump(image_loader_idle, args.timeout)
+        images_done = time.perf_counter()
+        stats = server_stats(args.base)
+
+        return {
+            "characters": args.child,
+            "run": label,
+            "mode": args.mode,
+            "engine": args.engine,
+            "first_card_ms": round((marks.get("first_card", done) - start) * 1000, 1),
+            "refresh_ms": round((done - start) * 1000, 1),
+            "images_ms": round((images_done - start) * 1000, 1),
+            "requests": stats["requests"] - stats_before["requests"],
+            "kilobytes": round((stats["bytes"] - stats_before["bytes"]) / 1024, 1),
+        }
+
+    results = [refresh("cold"), refresh("warm")]
+    rss = peak_rss_mb()
+    for result in results:
+        result["peak_rss_mb"] = round(rss, 1) if rss is not None else None
+        print(json.dumps(result), flush=True)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="角色資料更新的端對端效能測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="名單大小")
+    parser.add_argument("--latency", type=float, default=80, help="測試伺服器延遲（毫秒）")
+    parser.add_argument("--jitter", type=float, default=40, help="延遲的隨機變動範圍（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="測試伺服器回應 503 的機率")
+    parser.add_argument("--mode", choices=["stream", "batch"], default="stream",
+                        help="stream 逐一顯示（display_character），batch 全部完成後一次顯示（display_data）")
+    parser.add_argument("--engine", choices=["widgets", "view"], default="widgets", help="顯示方式（RENDER_ENGINE）")
+    parser.add_argument("--rate", type=float, default=1000,
+                        help="每秒請求上限；預設幾乎不限制，以免量到的是限流而非更新流程")
+    parser.add_argument("--timeout", type=float, default=300, help="單次更新的逾時（秒）")
+    parser.add_argument("--json", help="另外將結果以 JSON lines 寫入此檔案")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--base", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        return run_child(args)
+
+    sys.path.insert(0, TOOLS_DIR)
+    from mock_raiderio import start_in_thread
+
+    server, mock = start_in_thread(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                                   error_rate=args.error_rate, roster_size=max(args.sizes))
+    results = []
+    try:
+        for size in args.sizes:
+            command = [sys.executable, os.path.abspath(__file__), "--child", str(size), "--base", mock.base_url,
+                       "--mode", args.mode, "--engine", args.engine, "--rate", str(args.rate),
+                       "--timeout", str(args.timeout)]
+            completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8")
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+            if completed.returncode != 0 or not lines:
+                print(f"{size} 個角色的測試失敗：\n{completed.stderr}", file=sys.stderr)
+                continue
+            results.extend(json.loads(line) for line in lines)
+    finally:
+        server.shutdown()
+
+    print(f"{'角色數':>6} {'快取':>5} {'首張卡片':>10} {'更新完成':>10} {'圖片完成':>10} {'請求數':>7} {'傳輸量':>8} "
+          f"{'記憶體峰值':>10}")
+    for result in results:
+        rss = f"{result['peak_rss_mb']:.1f} MB" if result["peak_rss_mb"] is not None else "n/a"
+        print(f"{result['characters']:>9} {result['run']:>7} {result['first_card_ms']:>11.1f}ms "
+              f"{result['refresh_ms']:>11.1f}ms {result['images_ms']:>11.1f}ms {result['requests']:>10} "
+              f"{result['kilobytes']:>8.1f} KB {rss:>14}")
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as file:
+            for result in results:
+                file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
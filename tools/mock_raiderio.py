@@ -0,0 +1,253 @@
+"""本機 Raider.IO 測試伺服器：以固定的亂數種子產生角色、詞綴、公會與圖片資料，
+可設定延遲、抖動與錯誤率，用於可重現的效能測試
+
+用法：
+    python tools/mock_raiderio.py --port 8765 --latency 80 --jitter 40 --error-rate 0.02
+    RAIDERIO_API_BASE=http://127.0.0.1:8765/api/v1 RAIDERIO_ICON_BASE=http://127.0.0.1:8765/icons python main.py
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from raiderio_core import DUNGEON_NAME_MAPPING
+
+CLASSES = ["Death Knight", "Demon Hunter", "Druid", "Evoker", "Hunter", "Mage", "Monk",
+           "Paladin", "Priest", "Rogue", "Shaman", "Warlock", "Warrior"]
+
+AFFIXES = [
+    (9, "Tyrannical", "首領生命值與傷害提高。", "achievement_boss_archaedas"),
+    (10, "Fortified", "非首領敵人生命值與傷害提高。", "ability_toughness"),
+    (148, "Xal'atath's Bargain: Ascendant", "薩拉塔斯的交易：昇華。", "spell_azerite_essence_15"),
+    (152, "Challenger's Peril", "死亡會扣除剩餘時間。", "spell_holy_divineprovidence"),
+]
+
+def solid_png(width, height, rgb):
+    """產生單色 PNG（只用標準函式庫），作為縮圖與圖示"""
+    raw = b"".join(b"\x00" + bytes(rgb) * width for _ in range(height))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+class MockRaiderIO:
+    """產生測試資料並統計請求數量；同一個角色名稱與種子每次都會得到相同的資料"""
+
+    def __init__(self, base_url, latency=0.0, jitter=0.0, error_rate=0.0, roster_size=100, seed=0):
+        self.base_url = base_url.rstrip("/")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.roster_size = roster_size
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.requests = Counter()
+        self.bytes_sent = 0
+
+    def delay(self):
+        """每個請求的模擬延遲（秒）：latency ± jitter"""
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def count(self, route):
+        with self._lock:
+            self.requests[route] += 1
+
+    def add_bytes(self, size):
+        with self._lock:
+            self.bytes_sent += size
+
+    def stats(self):
+        with self._lock:
+            return {"requests": sum(self.requests.values()), "by_route": dict(self.requests), "bytes": self.bytes_sent}
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+
+    def character(self, region, realm, name, fields=None):
+        """角色資料；與正式 API 相同，只回傳 fields（以逗號分隔）要求的欄位，None 表示全部"""
+        rng = random.Random(f"{self.seed}|{region.lower()}|{realm.lower()}|{name.lower()}")
+        best_runs = []
+        recent_runs = []
+        total = 0.0
+        for dungeon in DUNGEON_NAME_MAPPING:
+            level = rng.randint(2, 20)
+            score = round(level * 15.5 + rng.uniform(0, 10), 1)
+            total += score
+            day = rng.randint(1, 9)
+            best_runs.append({
+                "dungeon": dungeon,
+                "mythic_level": level,
+                "score": score,
+                "num_keystone_upgrades": rng.randint(0, 3),
+                "clear_time_ms": rng.randint(1_000_000, 2_500_000),
+                "completed_at": f"2025-03-0{day}T10:20:30.000Z",
+            })
+            for offset in range(rng.randint(0, 3)):
+                recent_runs.append({
+                    "dungeon": dungeon,
+                    "mythic_level": max(2, level - offset),
+                    "score": round(score - offset * 7.5, 1),
+                    "num_keystone_upgrades": rng.randint(0, 2),
+                    "clear_time_ms": rng.choice([None, rng.randint(1_000_000, 2_500_000)]),
+                    "completed_at": f"2025-03-1{rng.randint(0, 9)}T{rng.randint(10, 23)}:00:00.000Z",
+                })
+        data = {
+            "name": name,
+            "region": region,
+            "realm": realm,
+            "class": rng.choice(CLASSES),
+            "thumbnail_url": f"{self.base_url}/thumbnails/{region}/{realm}/{name}.jpg",
+        }
+        optional = {
+            "mythic_plus_scores_by_season": [{"season": "mock-season", "scores": {"all": round(total, 1)}}],
+            "mythic_plus_best_runs": best_runs,
+            "mythic_plus_recent_runs": recent_runs,
+        }
+        requested = None if fields is None else {field.split(":")[0].strip() for field in fields.split(",")}
+        data.update((key, value) for key, value in optional.items() if requested is None or key in requested)
+        return data
+
+    def guild(self, region, realm, name):
+        rng = random.Random(f"{self.seed}|guild|{region.lower()}|{realm.lower()}|{name.lower()}")
+        members = [{
+            "rank": min(9, index // 10),
+            "character": {"name": f"c{index}", "realm": realm, "region": region,
+                          "class": rng.choice(CLASSES), "level": rng.choice([70, 80, 80, 80])},
+        } for index in range(self.roster_size)]
+        return {"name": name, "region": region, "realm": realm, "members": members}
+
+    def affixes(self, region):
+        return {
+            "region": region,
+            "title": ", ".join(name for _, name, _, _ in AFFIXES),
+            "affix_details": [{"id": affix_id, "name": name, "description": description, "icon": icon}
+                              for affix_id, name, description, icon in AFFIXES],
+        }
+
+    def image(self, path):
+        digest = hashlib.sha1(path.encode("utf-8")).digest()
+        return solid_png(56, 56, digest[:3])
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None  # 由 make_server 設定
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path
+
+        if path == "/__stats":
+            return self.send_json(self.mock.stats())
+        if path == "/__reset":
+            self.mock.reset()
+            return self.send_json({"ok": True})
+
+        time.sleep(self.mock.delay())
+        if path == "/api/v1/characters/profile":
+            self.mock.count("profile")
+            if self.mock.should_fail():
+                return self.send_json({"statusCode": 503, "error": "Service Unavailable"}, 503)
+            if not params.get("name") or not params.get("realm"):
+                return self.send_json({"statusCode": 400, "error": "Bad Request",
+                                       "message": "Could not find requested character"}, 400)
+            return self.send_json(self.mock.character(params.get("region", "us"), params["realm"], params["name"],
+                                                      params.get("fields")))
+        if path == "/api/v1/guilds/profile":
+            self.mock.count("guild")
+            if self.mock.should_fail():
+                return self.send_json({"statusCode": 503, "error": "Service Unavailable"}, 503)
+            return self.send_json(self.mock.guild(params.get("region", "us"), params.get("realm", ""), params.get("name", "")))
+        if path == "/api/v1/mythic-plus/affixes":
+            self.mock.count("affixes")
+            return self.send_json(self.mock.affixes(params.get("region", "us")))
+        if path.startswith("/thumbnails/") or path.startswith("/icons/"):
+            self.mock.count("thumbnail" if path.startswith("/thumbnails/") else "icon")
+            if self.mock.should_fail():
+                return self.send_body(b"", "text/plain", 503)
+            return self.send_body(self.mock.image(path), "image/png")
+        self.send_body(b"not found", "text/plain", 404)
+
+    def send_json(self, data, status=200):
+        self.send_body(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", status)
+
+    def send_body(self, body, content_type, status=200):
+        # 內容不變時以 ETag 回應 304，與正式 API 的條件式請求行為相同
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not self.path.startswith("/__"):
+            self.mock.add_bytes(len(body))  # 統計回應的傳輸量（不含統計用的路徑）
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_server(host="127.0.0.1", port=0, **options):
+    """建立測試伺服器（port 為 0 時自動選擇），回傳 (server, MockRaiderIO)"""
+    server = ThreadingHTTPServer((host, port), None)
+    server.daemon_threads = True
+    mock = MockRaiderIO(f"http://{host}:{server.server_address[1]}", **options)
+    server.RequestHandlerClass = type("BoundMockRequestHandler", (MockRequestHandler,), {"mock": mock})
+    return server, mock
+
+def start_in_thread(**options):
+    """在背景執行緒啟動測試伺服器，回傳 (server, MockRaiderIO)；以 server.shutdown() 結束"""
+    server, mock = make_server(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, mock
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本機 Raider.IO 測試伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 表示自動選擇")
+    parser.add_argument("--latency", type=float, default=50, help="每個請求的延遲（毫秒）")
+    parser.add_argument("--jitter", type=float, default=20, help="延遲的隨機變動範圍（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回應 503 的機率（0 到 1）")
+    parser.add_argument("--roster-size", type=int, default=100, help="公會成員數量")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server, mock = make_server(args.host, args.port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                               error_rate=args.error_rate, roster_size=args.roster_size, seed=args.seed)
+    print(f"{mock.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())